@@ -15,101 +15,435 @@ Key patterns demonstrated:
 - Quality gates and coverage requirements
 """
 
+# File: pytest.ini (excerpt)
+# [pytest]
+# # pytest-xdist: one worker per core, each with its own database and app
+# addopts = -n auto
+# asyncio_mode = auto
+# # One event loop for the whole run so the session-scoped engine can be shared
+# asyncio_default_fixture_loop_scope = session
+# asyncio_default_test_loop_scope = session
+
+
 # File: tests/conftest.py
+import email
+import os
 import pytest
 import asyncio
-from typing import Generator, AsyncGenerator
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
-from fastapi.testclient import TestClient
-from httpx import AsyncClient
+import time
+from contextlib import contextmanager
+from typing import AsyncGenerator
+from sqlalchemy import event, text
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.pool import StaticPool
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
 
-from src.main import app
-from src.core.database import get_db, Base
+from src.main import create_app
+from src.core.auth import token_verifier
+from src.core.cache import TTLCache
+from src.core.database import get_db, get_read_session_factory, Base
+from src.core.query_guard import capture_queries, install_query_counter
+from src.core.rate_limit import rate_limiter
 from src.models.user import User
 from src.core.security import get_password_hash
+from src.services.cache_service import CacheService
+from src.services.email_service import email_queue
+from src.services.profile_cache import profile_cache
+from src.services.user_activity import user_activity
+from src.services.user_cache import user_cache
+
+# Test database configuration: in-memory SQLite by default,
+# e.g. TEST_DATABASE_URL=sqlite+aiosqlite:///./test.db to inspect a file
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+
+# "gw0", "gw1", ... under pytest-xdist; "master" for a plain run
+WORKER_ID = os.getenv("PYTEST_XDIST_WORKER", "master")
+
+
+def worker_database_url(url: str, worker_id: str) -> URL:
+    """
+    Give each xdist worker its own database.
+    
+    In-memory SQLite is already private to the process; file databases
+    get a per-worker file and server databases a per-worker name.
+    """
+    parsed = make_url(url)
+    if worker_id == "master" or parsed.database in (None, "", ":memory:"):
+        return parsed
+    if parsed.get_backend_name() == "sqlite":
+        root, ext = os.path.splitext(parsed.database)
+        return parsed.set(database=f"{root}_{worker_id}{ext}")
+    return parsed.set(database=f"{parsed.database}_{worker_id}")
+
+
+async def ensure_database_exists(url: URL) -> None:
+    """Create a per-worker Postgres database on first use."""
+    if url.get_backend_name() != "postgresql":
+        return
+    admin = create_async_engine(url.set(database="postgres"), isolation_level="AUTOCOMMIT")
+    try:
+        async with admin.connect() as conn:
+            exists = await conn.scalar(
+                text("SELECT 1 FROM pg_database WHERE datname = :name"), {"name": url.database}
+            )
+            if not exists:
+                await conn.execute(text(f'CREATE DATABASE "{url.database}"'))
+    finally:
+        await admin.dispose()
+
 
-# Test database configuration
-TEST_DATABASE_URL = "sqlite:///./test.db"
+def make_test_engine(url: URL) -> AsyncEngine:
+    """
+    Create the engine shared by the whole test session.
+    
+    SQLite needs pysqlite's implicit transaction handling disabled so
+    BEGIN and SAVEPOINT are emitted exactly as SQLAlchemy requests.
+    """
+    if url.get_backend_name() != "sqlite":
+        return create_async_engine(url)
+    
+    # StaticPool: one shared connection keeps an in-memory database alive
+    engine = create_async_engine(
+        url,
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    
+    @event.listens_for(engine.sync_engine, "connect")
+    def _disable_implicit_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+    
+    @event.listens_for(engine.sync_engine, "begin")
+    def _emit_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+    
+    return engine
 
-test_engine = create_engine(
-    TEST_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-)
 
-TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+@pytest.fixture(scope="session")
+async def test_engine() -> AsyncGenerator[AsyncEngine, None]:
+    """
+    Create the schema once per test session (once per xdist worker).
+    
+    Yields:
+        AsyncEngine: Engine bound to this worker's test database
+    """
+    url = worker_database_url(TEST_DATABASE_URL, WORKER_ID)
+    await ensure_database_exists(url)
+    engine = make_test_engine(url)
+    install_query_counter(engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    
+    yield engine
+    
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
 
 
 @pytest.fixture(scope="function")
-def db_session() -> Generator[Session, None, None]:
+async def db_session(test_engine) -> AsyncGenerator[AsyncSession, None]:
     """
-    Provide a clean database session for each test.
+    Provide a database session whose changes vanish after each test.
     
-    Creates fresh tables, yields session, then cleans up.
-    This ensures complete test isolation.
+    The session runs inside an outer transaction that is rolled back on
+    teardown. Commits made by the code under test only release a
+    SAVEPOINT, so tests stay isolated without recreating tables.
+    """
+    async with test_engine.connect() as connection:
+        transaction = await connection.begin()
+        session = AsyncSession(
+            bind=connection,
+            join_transaction_mode="create_savepoint",
+            expire_on_commit=False,
+            autoflush=False,
+        )
+        
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaction.rollback()
+
+
+@pytest.fixture(scope="session")
+def app() -> FastAPI:
     """
-    # Create all tables
-    Base.metadata.create_all(bind=test_engine)
+    Application instance owned by this test process.
     
-    # Create session
-    session = TestSessionLocal()
+    Dependency overrides are applied to this instance only, so
+    parallel workers never share or clobber each other's overrides.
+    """
+    return create_app()
+
+
+@pytest.fixture(autouse=True)
+def isolated_caches(monkeypatch, cache_service):
+    """
+    Point process-wide caches at a fresh FakeRedis with empty local tiers.
     
-    try:
-        yield session
-    finally:
-        session.close()
-        # Drop all tables for complete isolation
-        Base.metadata.drop_all(bind=test_engine)
+    Rolled-back rows must never be served from a cache filled by an
+    earlier test.
+    """
+    monkeypatch.setattr(user_cache, "backend", cache_service)
+    monkeypatch.setattr(user_cache, "local", TTLCache(maxsize=1000, ttl=user_cache.local.ttl))
+    monkeypatch.setattr(token_verifier.revocations, "backend", cache_service)
+    token_verifier.cache.clear()
+    monkeypatch.setattr(profile_cache, "backend", cache_service)
+    monkeypatch.setattr(profile_cache, "versions", TTLCache(maxsize=1000, ttl=profile_cache.versions.ttl))
+    monkeypatch.setattr(profile_cache, "bodies", TTLCache(maxsize=1000, ttl=profile_cache.bodies.ttl))
+    monkeypatch.setattr(rate_limiter, "backend", cache_service)
+    rate_limiter.reset()
 
 
 @pytest.fixture
-def client(db_session) -> TestClient:
+def assert_max_queries(test_engine):
     """
-    FastAPI test client with database session override.
+    Fail if a block runs more than n SQL statements.
     
-    Args:
-        db_session: Test database session
-        
-    Returns:
-        TestClient: Configured test client
+    Counts queries from the test and from requests made through
+    client; SAVEPOINT bookkeeping is excluded. Usage:
+    
+        with assert_max_queries(2):
+            await client.get("/users/batch", params=..., headers=...)
     """
-    def override_get_db():
-        yield db_session
+    @contextmanager
+    def check(n: int):
+        with capture_queries() as log:
+            yield log
+        assert len(log) <= n, f"expected at most {n} queries, got {log.format()}"
     
-    # Override dependency
-    app.dependency_overrides[get_db] = override_get_db
+    return check
+
+
+class OutboxTransport:
+    """Email transport that records messages instead of sending them."""
     
-    try:
-        with TestClient(app) as test_client:
-            yield test_client
-    finally:
-        # Clean up override
-        app.dependency_overrides.clear()
+    def __init__(self):
+        self.messages = []
+    
+    async def send_batch(self, messages):
+        self.messages.extend(messages)
+        return [None] * len(messages)
+
+
+@pytest.fixture(autouse=True)
+def email_outbox(monkeypatch, tmp_path) -> OutboxTransport:
+    """
+    Deliver queued email to memory and spool it under tmp_path.
+    
+    Keeps the app's email worker off the network and out of the
+    working directory.
+    """
+    outbox = OutboxTransport()
+    monkeypatch.setattr(email_queue, "transport", outbox)
+    monkeypatch.setattr(email_queue, "spool_dir", tmp_path / "email-spool")
+    return outbox
+
+
+class RecordingSession:
+    """Session stand-in that keeps flushed activity rows in memory."""
+    
+    def __init__(self, rows: list):
+        self.rows = rows
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        return False
+    
+    async def execute(self, statement, params):
+        self.rows.extend(params)
+    
+    async def commit(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def activity_rows(monkeypatch) -> list:
+    """
+    Capture the app's user activity flushes instead of writing them.
+    
+    A per-test pending map and a recording session keep the flush
+    worker, started by client, off the production engine.
+    """
+    rows = []
+    monkeypatch.setattr(user_activity, "session_factory", lambda: RecordingSession(rows))
+    monkeypatch.setattr(user_activity, "_pending", {})
+    return rows
 
 
 @pytest.fixture
-async def async_client(db_session) -> AsyncGenerator[AsyncClient, None]:
+async def client(
+    app, db_session, isolated_caches, email_outbox, activity_rows
+) -> AsyncGenerator[AsyncClient, None]:
     """
-    Async HTTP client for testing async endpoints.
+    HTTP client driving the started app on the test's event loop.
+    
+    db_session's connection belongs to the session loop, so requests
+    must run there too: the app is called in-process through
+    ASGITransport and its lifespan is entered on the same loop, never
+    in a TestClient portal thread.
+    
+    The lifespan runs per test. Its background workers start after this
+    test's cache, outbox and activity patches are in place and are
+    drained before those patches are undone, so no worker outlives the
+    test it belongs to.
     
     Args:
-        db_session: Test database session
+        app: Per-worker application instance
+        db_session: Transactional test session shared with the app
+        isolated_caches, email_outbox, activity_rows: Patches the
+            workers must see from startup to shutdown
         
     Yields:
-        AsyncClient: Async HTTP test client
+        AsyncClient: Client for the started app
     """
-    def override_get_db():
+    async def override_get_db():
         yield db_session
     
+    def open_test_session() -> AsyncSession:
+        # Same connection and outer transaction, so streamed reads see the test's rows
+        return AsyncSession(bind=db_session.bind, join_transaction_mode="create_savepoint", expire_on_commit=False)
+    
+    # Override dependencies
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_session_factory] = lambda: open_test_session
     
     try:
-        async with AsyncClient(app=app, base_url="http://test") as client:
-            yield client
+        async with app.router.lifespan_context(app):
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as test_client:
+                yield test_client
     finally:
+        # Clean up override
         app.dependency_overrides.clear()
 
 
+class FakeRedis:
+    """
+    In-memory stand-in for redis.asyncio.Redis.
+
+    Implements the subset of commands CacheService uses, with expiry,
+    so cache behaviour is testable without a Redis server.
+    """
+    
+    def __init__(self):
+        self.store = {}
+    
+    def _live(self, key):
+        entry = self.store.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            del self.store[key]
+            return None
+        return entry
+    
+    async def get(self, key):
+        entry = self._live(key)
+        return entry[0] if entry else None
+    
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and self._live(key) is not None:
+            return None
+        self.store[key] = (value, time.monotonic() + ex if ex else None)
+        return True
+    
+    async def delete(self, *keys):
+        return sum(self.store.pop(key, None) is not None for key in keys)
+    
+    async def incrby(self, key, amount):
+        entry = self._live(key)
+        value = int(entry[0]) + amount if entry else amount
+        self.store[key] = (str(value), entry[1] if entry else None)
+        return value
+    
+    async def expire(self, key, seconds):
+        entry = self._live(key)
+        if entry is None:
+            return False
+        self.store[key] = (entry[0], time.monotonic() + seconds)
+        return True
+    
+    async def ping(self):
+        return True
+
+
+@pytest.fixture
+def fake_redis() -> FakeRedis:
+    """Fresh in-memory Redis stand-in."""
+    return FakeRedis()
+
+
+@pytest.fixture
+def cache_service(fake_redis) -> CacheService:
+    """CacheService backed by the in-memory Redis stand-in."""
+    return CacheService(client=fake_redis)
+
+
+class FakeSMTPServer:
+    """
+    Local SMTP server speaking just enough RFC 5321 for smtplib.
+    
+    Records delivered messages and connection count; set fail_next
+    to answer the next N DATA commands with a transient 451.
+    """
+    
+    def __init__(self):
+        self.messages = []
+        self.connections = 0
+        self.fail_next = 0
+        self.port = None
+        self._server = None
+    
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+    
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+    
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        writer.write(b"220 fake ESMTP\r\n")
+        while line := await reader.readline():
+            command = line.decode().strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                reply = b"250 fake\r\n"
+            elif command.startswith(("MAIL", "RCPT", "RSET", "NOOP")):
+                reply = b"250 OK\r\n"
+            elif command == "DATA":
+                writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                data = await reader.readuntil(b"\r\n.\r\n")
+                if self.fail_next:
+                    self.fail_next -= 1
+                    reply = b"451 Try again later\r\n"
+                else:
+                    self.messages.append(email.message_from_bytes(data[:-5]))
+                    reply = b"250 Queued\r\n"
+            elif command == "QUIT":
+                writer.write(b"221 Bye\r\n")
+                break
+            else:
+                reply = b"502 Not implemented\r\n"
+            writer.write(reply)
+            await writer.drain()
+        await writer.drain()
+        writer.close()
+
+
+@pytest.fixture
+async def smtp_server() -> AsyncGenerator[FakeSMTPServer, None]:
+    """Fake SMTP server on a free local port."""
+    server = FakeSMTPServer()
+    await server.start()
+    yield server
+    await server.stop()
+
+
 @pytest.fixture
 def sample_user_data() -> dict:
     """
@@ -127,7 +461,7 @@ def sample_user_data() -> dict:
 
 
 @pytest.fixture
-def authenticated_user(db_session, sample_user_data) -> User:
+async def authenticated_user(db_session, sample_user_data) -> User:
     """
     Create and return an authenticated test user.
     
@@ -149,8 +483,8 @@ def authenticated_user(db_session, sample_user_data) -> User:
     )
     
     db_session.add(user)
-    db_session.commit()
-    db_session.refresh(user)
+    await db_session.commit()
+    await db_session.refresh(user)
     
     return user
 
@@ -172,12 +506,59 @@ def auth_headers(authenticated_user) -> dict:
     return {"Authorization": f"Bearer {token}"}
 
 
+@pytest.fixture
+async def superuser_headers(db_session) -> dict:
+    """
+    Create a superuser and return bearer headers for admin endpoints.
+    
+    Args:
+        db_session: Database session
+        
+    Returns:
+        dict: Headers with bearer token
+    """
+    from src.core.auth import create_access_token
+    
+    admin = User(
+        email="admin@example.com",
+        username="admin",
+        hashed_password=get_password_hash("adminpassword123"),
+        is_active=True,
+        is_verified=True,
+        is_superuser=True,
+    )
+    db_session.add(admin)
+    await db_session.commit()
+    await db_session.refresh(admin)
+    
+    token = create_access_token(data={"sub": str(admin.id)})
+    return {"Authorization": f"Bearer {token}"}
+
+
 # File: tests/test_patterns/test_unit_patterns.py
+import asyncio
+import json
 import pytest
+import time
+from datetime import datetime, timedelta, timezone
 from unittest.mock import Mock, patch, AsyncMock
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from jose import jwt
 from pydantic import ValidationError
 
-from src.schemas.user import UserCreate, UserUpdate, UserResponse
+from src.api.health import ReadinessProbe
+from src.core.auth import RevocationList, TokenVerifier, create_access_token
+from src.schemas.user import UserCreate, UserRecord, UserUpdate, UserResponse, records_json
+from src.core.cache import MISSING, TTLCache
+from src.core.config import get_settings
+from src.core.hashing import HashingSaturatedError, PasswordHashExecutor
+from src.core.instrumentation import Histogram, RequestTimings, current_timings, timed
+from src.core.query_guard import QueryLog
+from src.services.user_activity import UserActivityBuffer
+from src.core.responses import FastJSONResponse
+from src.services.user_cache import UserCache
 from src.services.user_service import UserService
 from src.models.user import User
 
@@ -261,8 +642,10 @@ class TestUserService:
     
     @pytest.fixture
     def mock_db_session(self):
-        """Mock database session."""
-        return Mock()
+        """Mock AsyncSession (add() is sync, everything else awaited)."""
+        session = AsyncMock()
+        session.add = Mock()
+        return session
     
     @pytest.fixture
     def user_service(self, mock_db_session):
@@ -273,19 +656,23 @@ class TestUserService:
         """Test successful user retrieval by ID."""
         # Arrange
         expected_user = User(id=1, email="test@example.com", username="testuser")
-        mock_db_session.query.return_value.filter.return_value.first.return_value = expected_user
+        mock_db_session.execute.return_value = Mock(
+            scalar_one_or_none=Mock(return_value=expected_user)
+        )
         
         # Act
         result = await user_service.get_user_by_id(1)
         
         # Assert
         assert result == expected_user
-        mock_db_session.query.assert_called_once_with(User)
+        mock_db_session.execute.assert_awaited_once()
     
     async def test_get_user_by_id_not_found(self, user_service, mock_db_session):
         """Test user retrieval when user doesn't exist."""
         # Arrange
-        mock_db_session.query.return_value.filter.return_value.first.return_value = None
+        mock_db_session.execute.return_value = Mock(
+            scalar_one_or_none=Mock(return_value=None)
+        )
         
         # Act
         result = await user_service.get_user_by_id(999)
@@ -309,323 +696,2730 @@ class TestUserService:
         
         # Assert
         mock_db_session.add.assert_called_once()
-        mock_db_session.commit.assert_called_once()
-        mock_db_session.refresh.assert_called_once()
+        mock_db_session.commit.assert_awaited_once()
+        mock_db_session.refresh.assert_awaited_once()
         mock_hash.assert_called_once_with("plainpassword")
 
 
-# File: tests/test_patterns/test_integration_patterns.py
-import pytest
-from fastapi.testclient import TestClient
-from httpx import AsyncClient
-
-from src.main import app
+class TestFastJSONResponse:
+    """Unit tests for the direct model-to-bytes response class."""
+    
+    def test_model_render_matches_default_encoding(self):
+        """Test FastJSONResponse output decodes to the same JSON as JSONResponse."""
+        # Arrange
+        model = UserResponse(
+            id=1,
+            email="test@example.com",
+            username="testuser",
+            full_name="Test User",
+            is_active=True,
+            created_at=datetime(2025, 1, 1, 12, 0, 0),
+        )
+        
+        # Act
+        fast = FastJSONResponse(model).body
+        default = JSONResponse(jsonable_encoder(model)).body
+        
+        # Assert
+        assert json.loads(fast) == json.loads(default)
+    
+    def test_plain_content_still_supported(self):
+        """Test dict content renders without a model."""
+        # Act
+        body = FastJSONResponse({"status": "healthy"}).body
+        
+        # Assert
+        assert json.loads(body) == {"status": "healthy"}
 
 
-class TestHealthEndpointIntegration:
-    """
-    Integration tests for health check endpoint.
+class TestUserRecord:
+    """Unit tests for the slotted read model."""
     
-    Tests full HTTP request/response cycle including
-    middleware, routing, and response formatting.
-    """
+    def _record(self, **overrides) -> UserRecord:
+        fields = dict(
+            id=1,
+            email="test@example.com",
+            username="testuser",
+            full_name="Tëst Üser",
+            bio=None,
+            is_active=True,
+            created_at=datetime(2025, 1, 1, 12, 0, 0),
+        )
+        fields.update(overrides)
+        return UserRecord(**fields)
     
-    def test_health_endpoint_success(self, client: TestClient):
-        """Test health endpoint returns expected structure."""
+    def test_json_matches_user_response(self):
+        """Test to_json produces the exact bytes UserResponse would."""
+        # Arrange
+        record = self._record()
+        
         # Act
-        response = client.get("/health")
+        body = record.to_json()
         
         # Assert
-        assert response.status_code == 200
+        assert body == UserResponse.model_validate(record.as_dict()).model_dump_json().encode()
+    
+    def test_json_matches_for_utc_timestamps(self):
+        """Test aware UTC datetimes use pydantic's "Z" suffix."""
+        # Arrange
+        record = self._record(created_at=datetime(2025, 1, 1, 12, 0, 0, tzinfo=timezone.utc))
         
-        data = response.json()
-        assert "status" in data
-        assert "version" in data
-        assert "timestamp" in data
-        assert "uptime_seconds" in data
+        # Act
+        body = record.to_json()
         
-        assert data["status"] == "healthy"
-        assert isinstance(data["uptime_seconds"], (int, float))
+        # Assert
+        assert body == UserResponse.model_validate(record.as_dict()).model_dump_json().encode()
     
-    def test_health_endpoint_performance(self, client: TestClient):
-        """Test health endpoint response time."""
-        import time
-        
+    def test_records_json_is_array(self):
+        """Test records_json encodes a list, including the empty case."""
         # Act
-        start_time = time.time()
-        response = client.get("/health")
-        end_time = time.time()
+        body = records_json([self._record(id=1), self._record(id=2)])
         
         # Assert
-        response_time = end_time - start_time
-        assert response.status_code == 200
-        assert response_time < 0.1  # Less than 100ms
+        assert [user["id"] for user in json.loads(body)] == [1, 2]
+        assert records_json([]) == b"[]"
+    
+    def test_has_no_instance_dict(self):
+        """Test records are slotted, so no per-instance __dict__ is allocated."""
+        # Assert
+        assert not hasattr(self._record(), "__dict__")
 
 
-class TestUserEndpointIntegration:
-    """
-    Integration tests for user endpoints.
-    
-    Tests authentication, authorization, and data persistence
-    through the full application stack.
-    """
+class TestRequestInstrumentation:
+    """Unit tests for phase timing and histogram rendering."""
     
-    def test_get_user_profile_authenticated(self, client: TestClient, auth_headers: dict):
-        """Test authenticated user can retrieve own profile."""
+    def test_timed_is_noop_outside_sampled_request(self):
+        """Test timed() records nothing when no request is being timed."""
         # Act
-        response = client.get("/users/me", headers=auth_headers)
+        with timed("db"):
+            pass
         
         # Assert
-        assert response.status_code == 200
-        
-        data = response.json()
-        assert "id" in data
-        assert "email" in data
-        assert "username" in data
-        assert "hashed_password" not in data  # Sensitive data excluded
+        assert current_timings() is None
     
-    def test_get_user_profile_unauthenticated(self, client: TestClient):
-        """Test unauthenticated request returns 401."""
+    def test_server_timing_header_accumulates_phases(self):
+        """Test repeated phases are summed and counted in the header."""
+        # Arrange
+        timings = RequestTimings()
+        
         # Act
-        response = client.get("/users/me")
+        timings.add("db", 0.002)
+        timings.add("db", 0.003)
+        header = timings.server_timing()
         
         # Assert
-        assert response.status_code == 401
+        assert 'db;dur=5.000;desc="2x"' in header
+        assert "total;dur=" in header
     
-    def test_update_user_profile_success(self, client: TestClient, auth_headers: dict):
-        """Test successful user profile update."""
+    def test_histogram_buckets_are_cumulative(self):
+        """Test rendered buckets follow Prometheus cumulative semantics."""
         # Arrange
-        update_data = {
-            "full_name": "Updated Name",
-            "bio": "Updated bio"
-        }
+        histogram = Histogram("latency_seconds", "Test.", ("route",), buckets=(0.1, 1.0))
         
         # Act
-        response = client.patch("/users/me", headers=auth_headers, json=update_data)
+        histogram.observe(("/a",), 0.05)
+        histogram.observe(("/a",), 0.5)
+        histogram.observe(("/a",), 5.0)
+        lines = histogram.render()
         
         # Assert
-        assert response.status_code == 200
-        
-        data = response.json()
-        assert data["full_name"] == "Updated Name"
-        assert data["bio"] == "Updated bio"
-
-
-# File: tests/test_patterns/test_async_patterns.py
-import pytest
-import asyncio
-from httpx import AsyncClient
+        assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+        assert 'latency_seconds_bucket{route="/a",le="1.0"} 2' in lines
+        assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+        assert 'latency_seconds_count{route="/a"} 3' in lines
 
 
-class TestAsyncEndpoints:
-    """
-    Test patterns for async endpoint testing.
-    
-    Demonstrates proper async test setup and execution
-    for async FastAPI endpoints.
-    """
+class TestQueryLog:
+    """Unit tests for N+1 detection in recorded statements."""
     
-    @pytest.mark.asyncio
-    async def test_async_health_endpoint(self, async_client: AsyncClient):
-        """Test health endpoint using async client."""
+    def test_repeated_statements_reported(self):
+        """Test identical SQL run per row is flagged, most frequent first."""
+        # Arrange
+        log = QueryLog()
+        log.record("SELECT * FROM users")
+        for _ in range(5):
+            log.record("SELECT * FROM posts WHERE user_id = ?")
+        
         # Act
-        response = await async_client.get("/health")
+        repeated = log.repeated(threshold=3)
         
         # Assert
-        assert response.status_code == 200
-        
-        data = response.json()
-        assert data["status"] == "healthy"
+        assert repeated == [("SELECT * FROM posts WHERE user_id = ?", 5)]
+        assert len(log) == 6
     
-    @pytest.mark.asyncio
-    async def test_concurrent_requests(self, async_client: AsyncClient):
-        """Test handling of concurrent requests."""
+    def test_transaction_bookkeeping_not_counted(self):
+        """Test SAVEPOINT statements from the test harness are ignored."""
         # Arrange
-        num_requests = 5
+        log = QueryLog()
         
-        # Act - Send multiple concurrent requests
-        tasks = [
-            async_client.get("/health")
-            for _ in range(num_requests)
-        ]
-        responses = await asyncio.gather(*tasks)
+        # Act
+        log.record("SAVEPOINT sa_savepoint_1")
+        log.record("SELECT 1")
+        log.record("RELEASE SAVEPOINT sa_savepoint_1")
         
         # Assert
-        assert len(responses) == num_requests
-        for response in responses:
-            assert response.status_code == 200
-            assert response.json()["status"] == "healthy"
-
-
-# File: tests/test_patterns/test_mock_patterns.py
-import pytest
-from unittest.mock import Mock, patch, AsyncMock
-import asyncio
+        assert log.statements == ["SELECT 1"]
 
 
-class TestMockingPatterns:
-    """
-    Demonstrate effective mocking patterns for testing.
-    
-    Shows how to mock external dependencies, async functions,
-    and database operations.
-    """
+class TestReadinessProbe:
+    """Unit tests for concurrent, cached dependency checks."""
     
-    @patch('src.services.email_service.EmailService.send_email')
-    async def test_mock_external_service(self, mock_send_email):
-        """Test mocking external email service."""
+    async def test_slow_dependency_times_out(self):
+        """Test a hung check reports timeout without blocking the others."""
         # Arrange
-        mock_send_email.return_value = {"status": "sent", "message_id": "123"}
+        async def healthy():
+            return None
         
-        from src.services.email_service import EmailService
-        email_service = EmailService()
+        async def hung():
+            await asyncio.sleep(10)
+        
+        probe = ReadinessProbe({"database": healthy, "cache": hung}, timeout=0.05, ttl=5)
         
         # Act
-        result = await email_service.send_welcome_email("test@example.com")
+        start = time.perf_counter()
+        report = await probe.run()
+        elapsed = time.perf_counter() - start
         
         # Assert
-        mock_send_email.assert_called_once_with(
-            to="test@example.com",
-            template="welcome",
-            context={}
+        assert report["status"] == "unavailable"
+        assert report["checks"]["database"]["status"] == "ok"
+        assert report["checks"]["cache"]["status"] == "timeout"
+        assert elapsed < 1
+    
+    async def test_result_cached_and_shared(self):
+        """Test concurrent and repeated probes run the checks once per TTL."""
+        # Arrange
+        calls = 0
+        
+        async def counting():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+        
+        probe = ReadinessProbe({"database": counting}, timeout=1, ttl=60)
+        
+        # Act
+        reports = await asyncio.gather(*(probe.run() for _ in range(10)))
+        await probe.run()
+        
+        # Assert
+        assert calls == 1
+        assert all(report["status"] == "ready" for report in reports)
+    
+    async def test_failing_check_reports_error(self):
+        """Test exceptions from a check mark the service unavailable."""
+        # Arrange
+        async def broken():
+            raise ConnectionError("refused")
+        
+        probe = ReadinessProbe({"database": broken}, timeout=1, ttl=0)
+        
+        # Act
+        report = await probe.run()
+        
+        # Assert
+        assert report["checks"]["database"] == {"status": "error", "error": "ConnectionError"}
+
+
+class TestUserActivityBuffer:
+    """
+    Unit tests for write-behind coalescing and failure handling.
+    
+    Each test flushes its own buffer into a mock session, never the
+    app-wide user_activity that a running lifespan may be draining.
+    """
+    
+    @pytest.fixture
+    def session(self):
+        session = AsyncMock()
+        session.__aenter__.return_value = session
+        return session
+    
+    @pytest.fixture
+    def buffer(self, session) -> UserActivityBuffer:
+        return UserActivityBuffer(lambda: session)
+    
+    @staticmethod
+    def written_rows(session) -> list:
+        return [
+            (row["user_id"], row["logins"])
+            for call in session.execute.await_args_list
+            for row in call.args[1]
+        ]
+    
+    async def test_activity_coalesces_per_user(self, buffer, session):
+        """Test repeated activity by one user becomes a single row."""
+        # Act
+        for _ in range(3):
+            buffer.record_login(1)
+        buffer.touch(1)
+        buffer.touch(2)
+        written = await buffer.flush()
+        
+        # Assert
+        assert written == 2
+        assert sorted(self.written_rows(session)) == [(1, 3), (2, 0)]
+    
+    async def test_failed_flush_is_retried(self, buffer, session):
+        """Test a failed flush keeps its deltas and merges newer activity."""
+        # Arrange
+        session.execute.side_effect = [ConnectionError("database unavailable"), None]
+        buffer.record_login(1)
+        
+        # Act
+        with pytest.raises(ConnectionError):
+            await buffer.flush()
+        buffer.record_login(1)
+        await buffer.flush()
+        
+        # Assert
+        last_params = session.execute.await_args.args[1]
+        assert [(row["user_id"], row["logins"]) for row in last_params] == [(1, 2)]
+        assert session.commit.await_count == 1
+        assert buffer.pending == 0
+
+
+class TestUserServiceBatching:
+    """Unit tests for chunking in UserService batch operations."""
+    
+    async def test_get_users_by_ids_chunks_in_queries(self):
+        """Test large ID lists are split into one IN query per chunk."""
+        # Arrange
+        session = AsyncMock()
+        session.scalars.side_effect = lambda stmt: [
+            User(id=user_id, email=f"u{user_id}@example.com", username=f"u{user_id}")
+            for user_id in stmt.compile().params["id_1"]
+        ]
+        service = UserService(session)
+        service.bulk_chunk_size = 2
+        
+        # Act
+        users = await service.get_users_by_ids([5, 3, 1, 3, 4])
+        
+        # Assert
+        assert [user.id for user in users] == [5, 3, 1, 4]
+        assert session.scalars.await_count == 2
+
+
+class TestPasswordHashExecutor:
+    """Unit tests for the bounded password hashing pool."""
+    
+    async def test_runs_inline_until_started(self):
+        """Test calls execute in-process when the pool isn't running."""
+        # Arrange
+        hasher = PasswordHashExecutor(max_workers=1, max_pending=1)
+        
+        # Act
+        result = await hasher.run(len, "password")
+        
+        # Assert
+        assert result == 8
+        assert hasher.metrics.submitted == 0
+    
+    async def test_rejects_when_queue_full(self):
+        """Test submissions beyond max_pending fail fast and are counted."""
+        # Arrange
+        hasher = PasswordHashExecutor(max_workers=1, max_pending=1)
+        hasher.start()
+        
+        try:
+            # Act
+            results = await asyncio.gather(
+                hasher.run(time.sleep, 0.2),
+                hasher.run(time.sleep, 0.2),
+                return_exceptions=True,
+            )
+        finally:
+            await hasher.shutdown()
+        
+        # Assert
+        assert results[0] is None
+        assert isinstance(results[1], HashingSaturatedError)
+        assert hasher.metrics.rejected == 1
+        assert hasher.metrics.as_dict()["pending"] == 0
+    
+    async def test_map_preserves_order(self):
+        """Test map splits work into fixed-size chunks and keeps input order."""
+        # Arrange
+        hasher = PasswordHashExecutor(max_workers=2, max_pending=4, map_chunk_size=2)
+        hasher.start()
+        
+        try:
+            # Act
+            results = await hasher.map(len, [("a",), ("bb",), ("ccc",), ("dddd",), ("eeeee",)])
+        finally:
+            await hasher.shutdown()
+        
+        # Assert
+        assert results == [1, 2, 3, 4, 5]
+        assert hasher.metrics.completed == 3
+    
+    async def test_run_not_starved_by_large_map(self):
+        """Test an interactive run() completes while a long map() is still going."""
+        # Arrange
+        hasher = PasswordHashExecutor(max_workers=1, max_pending=8, map_chunk_size=2)
+        hasher.start()
+        
+        try:
+            bulk = asyncio.create_task(hasher.map(time.sleep, [(0.05,)] * 40))
+            await asyncio.sleep(0.2)
+            
+            # Act
+            result = await hasher.run(len, "login")
+            bulk_still_running = not bulk.done()
+            await bulk
+        finally:
+            await hasher.shutdown()
+        
+        # Assert
+        assert result == 5
+        assert bulk_still_running
+
+
+class TestTokenVerifier:
+    """Unit tests for cached token verification and revocation."""
+    
+    @pytest.fixture
+    def verifier(self):
+        return TokenVerifier(cache=TTLCache(maxsize=100, ttl=60), revocations=RevocationList())
+    
+    async def test_repeat_verification_skips_decode(self, verifier):
+        """Test a cached token is not decoded again."""
+        # Arrange
+        token = create_access_token(data={"sub": "1"})
+        
+        # Act
+        with patch("src.core.auth.jwt.decode", wraps=jwt.decode) as mock_decode:
+            first = await verifier.verify(token)
+            second = await verifier.verify(token)
+        
+        # Assert
+        assert first == second
+        mock_decode.assert_called_once()
+    
+    async def test_revoked_token_rejected_when_cached(self, verifier):
+        """Test revocation applies to tokens already in the cache."""
+        # Arrange
+        token = create_access_token(data={"sub": "1"})
+        claims = await verifier.verify(token)
+        
+        # Act
+        await verifier.revoke(claims)
+        
+        # Assert
+        with pytest.raises(HTTPException) as exc_info:
+            await verifier.verify(token)
+        assert exc_info.value.status_code == 401
+    
+    async def test_cache_never_outlives_token(self, verifier):
+        """Test an expired token is rejected despite a longer cache TTL."""
+        # Arrange
+        token = create_access_token(data={"sub": "1"}, expires_delta=timedelta(seconds=1))
+        await verifier.verify(token)
+        
+        # Act
+        await asyncio.sleep(1.1)
+        
+        # Assert
+        with pytest.raises(HTTPException):
+            await verifier.verify(token)
+    
+    @pytest.mark.parametrize("claims", [{"sub": "1"}, {"exp": 4102444800}])
+    async def test_token_missing_required_claim_rejected(self, verifier, claims):
+        """Test a validly signed token without exp or sub is a 401, not a 500."""
+        # Arrange
+        settings = get_settings()
+        token = jwt.encode(claims, settings.SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+        
+        # Act
+        with pytest.raises(HTTPException) as exc_info:
+            await verifier.verify(token)
+        
+        # Assert
+        assert exc_info.value.status_code == 401
+
+
+class TestTTLCache:
+    """Unit tests for the in-process LRU/TTL cache."""
+    
+    def test_evicts_least_recently_used(self):
+        """Test entries beyond maxsize evict the LRU key."""
+        # Arrange
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")  # "b" is now least recently used
+        
+        # Act
+        cache.set("c", 3)
+        
+        # Assert
+        assert cache.get("b") is MISSING
+        assert cache.get("a") == 1
+        assert cache.stats.evictions == 1
+    
+    @patch("src.core.cache.time.monotonic")
+    def test_expired_entries_are_misses(self, mock_monotonic):
+        """Test entries are not served after their TTL."""
+        # Arrange
+        mock_monotonic.return_value = 100.0
+        cache = TTLCache(maxsize=10, ttl=5)
+        cache.set("a", 1)
+        
+        # Act
+        mock_monotonic.return_value = 106.0
+        
+        # Assert
+        assert cache.get("a") is MISSING
+        assert len(cache) == 0
+
+
+class TestUserServiceCaching:
+    """
+    Unit tests for UserService read-through caching.
+    
+    Database is mocked; the cache uses a real CacheService on FakeRedis.
+    """
+    
+    @pytest.fixture
+    def user_cache(self, cache_service):
+        return UserCache(
+            backend=cache_service,
+            local=TTLCache(maxsize=100, ttl=5),
+            ttl=300,
+            negative_ttl=30,
         )
-        assert result["status"] == "sent"
     
-    @patch('src.core.redis.Redis')
-    async def test_mock_redis_cache(self, mock_redis_class):
-        """Test mocking Redis cache operations."""
+    @pytest.fixture
+    def mock_db_session(self):
+        session = AsyncMock()
+        session.add = Mock()
+        return session
+    
+    def _returns(self, session, user):
+        session.execute.return_value = Mock(scalar_one_or_none=Mock(return_value=user))
+    
+    async def test_repeat_lookup_served_from_cache(self, user_cache, mock_db_session):
+        """Test second lookup by ID does not hit the database."""
         # Arrange
-        mock_redis = AsyncMock()
-        mock_redis_class.return_value = mock_redis
-        mock_redis.get.return_value = '{"cached": "data"}'
+        self._returns(mock_db_session, User(id=1, email="test@example.com", username="testuser"))
+        service = UserService(mock_db_session, cache=user_cache)
         
-        from src.services.cache_service import CacheService
-        cache_service = CacheService()
+        # Act
+        first = await service.get_user_by_id(1)
+        second = await service.get_user_by_id(1)
+        by_email = await service.get_user_by_email("test@example.com")
+        
+        # Assert
+        assert first.email == second.email == by_email.email
+        mock_db_session.execute.assert_awaited_once()
+        assert user_cache.stats.local_hits == 2
+    
+    async def test_email_case_shares_one_cache_entry(self, user_cache, mock_db_session):
+        """Test a differently-cased miss cannot cache a negative for the real user."""
+        # Arrange
+        self._returns(mock_db_session, User(id=1, email="test@example.com", username="testuser"))
+        service = UserService(mock_db_session, cache=user_cache)
         
         # Act
-        result = await cache_service.get("test_key")
+        upper = await service.get_user_by_email("TEST@example.com")
+        lower = await service.get_user_by_email("test@example.com")
         
         # Assert
-        mock_redis.get.assert_called_once_with("test_key")
-        assert result == {"cached": "data"}
+        assert upper.id == lower.id == 1
+        mock_db_session.execute.assert_awaited_once()
     
-    def test_mock_database_session(self):
-        """Test mocking database session operations."""
+    async def test_backend_tier_serves_other_workers(self, user_cache, cache_service, mock_db_session):
+        """Test a cold local tier falls back to the shared backend."""
         # Arrange
-        mock_session = Mock()
-        mock_query = Mock()
-        mock_session.query.return_value = mock_query
-        mock_query.filter.return_value = mock_query
-        mock_query.first.return_value = None
+        self._returns(mock_db_session, User(id=1, email="test@example.com", username="testuser"))
+        await UserService(mock_db_session, cache=user_cache).get_user_by_id(1)
+        other_worker = UserCache(cache_service, TTLCache(maxsize=100, ttl=5), ttl=300, negative_ttl=30)
         
-        from src.services.user_service import UserService
-        service = UserService(mock_session)
+        # Act
+        result = await UserService(mock_db_session, cache=other_worker).get_user_by_id(1)
+        
+        # Assert
+        assert result.username == "testuser"
+        mock_db_session.execute.assert_awaited_once()
+        assert other_worker.stats.backend_hits == 1
+    
+    def test_cached_record_excludes_password_hash(self):
+        """Test the shared cache tier never receives hashed_password."""
+        # Arrange
+        from src.services.user_cache import user_to_record
+        user = User(id=1, email="test@example.com", username="testuser", hashed_password="secret")
         
         # Act
-        result = asyncio.run(service.get_user_by_email("test@example.com"))
+        record = user_to_record(user)
         
         # Assert
-        assert result is None
-        mock_session.query.assert_called_once()
+        assert "hashed_password" not in record
+        assert record["email"] == "test@example.com"
+    
+    async def test_misses_are_negatively_cached(self, user_cache, mock_db_session):
+        """Test repeated lookups for a missing user hit the database once."""
+        # Arrange
+        self._returns(mock_db_session, None)
+        service = UserService(mock_db_session, cache=user_cache)
+        
+        # Act
+        assert await service.get_user_by_email("nobody@example.com") is None
+        assert await service.get_user_by_email("nobody@example.com") is None
+        
+        # Assert
+        mock_db_session.execute.assert_awaited_once()
+        assert user_cache.stats.negative_hits == 1
+    
+    @patch('src.services.user_service.get_password_hash')
+    async def test_create_user_clears_negative_entry(self, mock_hash, user_cache, mock_db_session):
+        """Test creating a user invalidates a cached miss for its email."""
+        # Arrange
+        mock_hash.return_value = "hashed_password"
+        self._returns(mock_db_session, None)
+        service = UserService(mock_db_session, cache=user_cache)
+        await service.get_user_by_email("test@example.com")
+        
+        # Act
+        await service.create_user(
+            UserCreate(email="test@example.com", username="testuser", password="plainpassword")
+        )
+        self._returns(mock_db_session, User(id=1, email="test@example.com", username="testuser"))
+        result = await service.get_user_by_email("test@example.com")
+        
+        # Assert
+        assert result is not None
+        assert mock_db_session.execute.await_count == 2
 
 
-# File: tests/test_patterns/test_performance_patterns.py
+# File: tests/test_patterns/test_integration_patterns.py
+import json
 import pytest
-import time
-from concurrent.futures import ThreadPoolExecutor
-from fastapi.testclient import TestClient
+from unittest.mock import Mock
+from httpx import ASGITransport, AsyncClient
 
+from src.core.config import get_settings
+from src.core.database import get_db
+from src.main import create_app
+from src.schemas.user import UserResponse
 
-class TestPerformancePatterns:
+
+class TestHealthEndpointIntegration:
     """
-    Performance testing patterns and benchmarks.
+    Integration tests for health check endpoint.
     
-    Ensures endpoints meet performance requirements
-    and can handle expected load.
+    Tests full HTTP request/response cycle including
+    middleware, routing, and response formatting.
     """
     
-    def test_endpoint_response_time(self, client: TestClient):
-        """Test endpoint meets response time requirements."""
-        # Arrange
-        max_response_time = 0.1  # 100ms
+    async def test_health_endpoint_success(self, client: AsyncClient):
+        """Test health endpoint returns expected structure."""
+        # Act
+        response = await client.get("/health")
+        
+        # Assert
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert "status" in data
+        assert "version" in data
+        assert "timestamp" in data
+        assert "uptime_seconds" in data
         
+        assert data["status"] == "healthy"
+        assert isinstance(data["uptime_seconds"], (int, float))
+    
+    async def test_liveness_body_is_precomputed(self, client: AsyncClient):
+        """Test back-to-back probes reuse the same serialized body."""
+        # Act
+        first = await client.get("/health")
+        second = await client.get("/health")
+        
+        # Assert
+        assert first.status_code == second.status_code == 200
+        assert first.content == second.content
+    
+    async def test_db_pool_metrics_exposed(self, client: AsyncClient):
+        """Test pool metrics endpoint reports checkout counters."""
+        # Act
+        response = await client.get("/health/db-pool")
+        
+        # Assert
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert "checkouts" in data
+        assert "avg_wait_ms" in data
+        assert "max_wait_ms" in data
+
+
+class TestInstrumentationIntegration:
+    """
+    Integration tests for the request instrumentation middleware.
+    
+    Uses its own app built with INSTRUMENTATION_ENABLED so the shared
+    app fixture keeps the default, uninstrumented configuration.
+    """
+    
+    @pytest.fixture
+    async def instrumented_client(self, monkeypatch):
+        monkeypatch.setenv("INSTRUMENTATION_ENABLED", "true")
+        get_settings.cache_clear()
+        app = create_app()
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            yield client
+        # Runs before monkeypatch restores the environment
+        get_settings.cache_clear()
+    
+    async def test_server_timing_header_reports_phases(self, instrumented_client: AsyncClient):
+        """Test sampled responses carry a Server-Timing breakdown."""
         # Act
-        start_time = time.time()
-        response = client.get("/health")
-        end_time = time.time()
+        response = await instrumented_client.get("/health/db-pool")
         
         # Assert
-        response_time = end_time - start_time
         assert response.status_code == 200
-        assert response_time < max_response_time
+        header = response.headers["server-timing"]
+        assert "routing;dur=" in header
+        assert "serialize;dur=" in header
+        assert "total;dur=" in header
     
-    def test_concurrent_load(self, client: TestClient):
-        """Test endpoint handles concurrent requests."""
+    async def test_metrics_endpoint_exposes_route_histograms(self, instrumented_client: AsyncClient):
+        """Test latency histograms are labelled by route template."""
         # Arrange
-        num_threads = 10
-        requests_per_thread = 5
+        await instrumented_client.get("/health/db-pool")
         
-        def make_requests():
-            responses = []
-            for _ in range(requests_per_thread):
-                response = client.get("/health")
-                responses.append(response.status_code)
-            return responses
+        # Act
+        response = await instrumented_client.get("/health/metrics")
         
+        # Assert
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'route="/health/db-pool"' in response.text
+        assert "http_request_phase_seconds_bucket" in response.text
+    
+    async def test_disabled_by_default(self, client: AsyncClient):
+        """Test the default app adds no instrumentation header."""
         # Act
-        with ThreadPoolExecutor(max_workers=num_threads) as executor:
-            futures = [executor.submit(make_requests) for _ in range(num_threads)]
-            results = [future.result() for future in futures]
+        response = await client.get("/health/db-pool")
         
         # Assert
-        for thread_results in results:
-            assert all(status == 200 for status in thread_results)
+        assert "server-timing" not in response.headers
+
+
+class TestRateLimitIntegration:
+    """
+    Integration tests for the login rate limit.
     
-    @pytest.mark.performance
-    def test_memory_usage(self, client: TestClient):
-        """Test endpoint memory usage stays within bounds."""
-        import psutil
-        import os
+    Uses its own app built with RATE_LIMIT_ENABLED, which is off by default.
+    """
+    
+    @pytest.fixture
+    async def limited_client(self, monkeypatch, db_session):
+        from src.core.rate_limit import RateLimitRule, rate_limiter
+        monkeypatch.setenv("RATE_LIMIT_ENABLED", "true")
+        monkeypatch.setitem(rate_limiter.rules, "/auth/token", RateLimitRule(limit=3, window=60))
+        get_settings.cache_clear()
+        app = create_app()
+        
+        async def override_get_db():
+            yield db_session
         
+        app.dependency_overrides[get_db] = override_get_db
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            yield client
+        # Runs before monkeypatch restores the environment
+        get_settings.cache_clear()
+    
+    async def test_login_rate_limited(self, limited_client: AsyncClient):
+        """Test repeated logins from one client get 429 with Retry-After."""
         # Arrange
-        process = psutil.Process(os.getpid())
-        initial_memory = process.memory_info().rss
+        form = {"username": "nobody@example.com", "password": "wrongpassword"}
         
-        # Act - Make many requests
-        for _ in range(100):
-            response = client.get("/health")
-            assert response.status_code == 200
+        # Act
+        statuses = [(await limited_client.post("/auth/token", data=form)).status_code for _ in range(3)]
+        limited = await limited_client.post("/auth/token", data=form)
+        
+        # Assert
+        assert statuses == [401, 401, 401]
+        assert limited.status_code == 429
+        assert int(limited.headers["Retry-After"]) >= 1
+    
+    async def test_trailing_slash_shares_budget(self, limited_client: AsyncClient):
+        """Test "/auth/token/" counts against the "/auth/token" budget."""
+        # Arrange
+        form = {"username": "nobody@example.com", "password": "wrongpassword"}
+        for _ in range(3):
+            await limited_client.post("/auth/token", data=form)
+        
+        # Act
+        response = await limited_client.post("/auth/token/", data=form)
+        
+        # Assert
+        assert response.status_code == 429
+    
+    async def test_disabled_by_default(self, client: AsyncClient):
+        """Test the default app never answers 429."""
+        # Arrange
+        form = {"username": "nobody@example.com", "password": "wrongpassword"}
+        
+        # Act
+        statuses = {(await client.post("/auth/token", data=form)).status_code for _ in range(12)}
         
         # Assert
-        final_memory = process.memory_info().rss
-        memory_increase = final_memory - initial_memory
+        assert statuses == {401}
+
+
+class TestUserEndpointIntegration:
+    """
+    Integration tests for user endpoints.
+    
+    Tests authentication, authorization, and data persistence
+    through the full application stack.
+    """
+    
+    async def test_get_user_profile_authenticated(self, client: AsyncClient, auth_headers: dict):
+        """Test authenticated user can retrieve own profile."""
+        # Act
+        response = await client.get("/users/me", headers=auth_headers)
         
-        # Memory increase should be reasonable (less than 10MB)
-        assert memory_increase < 10 * 1024 * 1024
+        # Assert
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert "id" in data
+        assert "email" in data
+        assert "username" in data
+        assert "hashed_password" not in data  # Sensitive data excluded
+    
+    async def test_get_user_profile_unauthenticated(self, client: AsyncClient):
+        """Test unauthenticated request returns 401."""
+        # Act
+        response = await client.get("/users/me")
+        
+        # Assert
+        assert response.status_code == 401
+    
+    async def test_logout_revokes_token(self, client: AsyncClient, auth_headers: dict):
+        """Test a token stops working after logout."""
+        # Act
+        logout = await client.post("/auth/logout", headers=auth_headers)
+        response = await client.get("/users/me", headers=auth_headers)
+        
+        # Assert
+        assert logout.status_code == 204
+        assert response.status_code == 401
+    
+    async def test_profile_served_from_token_without_db(self, app, client: AsyncClient, authenticated_user):
+        """Test an embedded profile answers /users/me without a session query once the user is cached."""
+        # Arrange
+        from src.core.auth import create_access_token
+        
+        profile = UserResponse.model_validate(authenticated_user)
+        token = create_access_token(data={"sub": str(authenticated_user.id)}, profile=profile)
+        headers = {"Authorization": f"Bearer {token}"}
+        await client.get("/users/me", headers=headers)  # fills the user cache
+        
+        async def unusable_db():
+            yield Mock(spec=[])  # any attribute access raises
+        
+        app.dependency_overrides[get_db] = unusable_db
+        
+        # Act
+        response = await client.get("/users/me", headers=headers)
+        
+        # Assert
+        assert response.status_code == 200
+        assert response.json()["email"] == authenticated_user.email
+    
+    async def test_unchanged_profile_returns_304(self, client: AsyncClient, auth_headers: dict):
+        """Test a matching If-None-Match gets 304 with no body."""
+        # Arrange
+        first = await client.get("/users/me", headers=auth_headers)
+        etag = first.headers["etag"]
+        
+        # Act
+        response = await client.get("/users/me", headers={**auth_headers, "If-None-Match": etag})
+        
+        # Assert
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        assert response.headers["cache-control"] == "private, no-cache"
+    
+    async def test_not_modified_skips_database(self, app, client: AsyncClient, auth_headers: dict):
+        """Test revalidation is answered without a session query."""
+        # Arrange
+        etag = (await client.get("/users/me", headers=auth_headers)).headers["etag"]
+        
+        async def unusable_db():
+            yield Mock(spec=[])  # any attribute access raises
+        
+        app.dependency_overrides[get_db] = unusable_db
+        
+        # Act
+        response = await client.get("/users/me", headers={**auth_headers, "If-None-Match": etag})
+        
+        # Assert
+        assert response.status_code == 304
+    
+    async def test_deactivated_user_not_served_cached_profile(
+        self, client: AsyncClient, db_session, authenticated_user, auth_headers: dict
+    ):
+        """Test neither a 304 nor a cached body is served once the user is inactive."""
+        # Arrange
+        from src.services.user_cache import UserCache, user_cache
+        etag = (await client.get("/users/me", headers=auth_headers)).headers["etag"]
+        authenticated_user.is_active = False
+        await db_session.commit()
+        await user_cache.invalidate(UserCache.id_key(authenticated_user.id))
+        
+        # Act
+        revalidated = await client.get("/users/me", headers={**auth_headers, "If-None-Match": etag})
+        fetched = await client.get("/users/me", headers=auth_headers)
+        
+        # Assert
+        assert revalidated.status_code == 401
+        assert fetched.status_code == 401
+    
+    async def test_deactivated_user_not_served_embedded_profile(
+        self, client: AsyncClient, db_session, authenticated_user
+    ):
+        """Test a token with an embedded profile stops working once the user is inactive."""
+        # Arrange
+        from src.core.auth import create_access_token
+        from src.services.user_cache import UserCache, user_cache
+        profile = UserResponse.model_validate(authenticated_user)
+        token = create_access_token(data={"sub": str(authenticated_user.id)}, profile=profile)
+        authenticated_user.is_active = False
+        await db_session.commit()
+        await user_cache.invalidate(UserCache.id_key(authenticated_user.id))
+        
+        # Act
+        response = await client.get("/users/me", headers={"Authorization": f"Bearer {token}"})
+        
+        # Assert
+        assert response.status_code == 401
+    
+    async def test_new_version_never_stores_stale_cached_user(
+        self, client: AsyncClient, db_session, authenticated_user, auth_headers: dict
+    ):
+        """Test a version bumped elsewhere gets the current body, not this worker's cached user."""
+        # Arrange
+        from src.services.profile_cache import profile_cache
+        old_etag = (await client.get("/users/me", headers=auth_headers)).headers["etag"]
+        # Another worker's PATCH: database and version change, this worker's user cache does not
+        authenticated_user.full_name = "Renamed Elsewhere"
+        await db_session.commit()
+        await profile_cache.bump(authenticated_user.id)
+        
+        # Act
+        response = await client.get("/users/me", headers={**auth_headers, "If-None-Match": old_etag})
+        
+        # Assert
+        assert response.status_code == 200
+        assert response.headers["etag"] != old_etag
+        assert response.json()["full_name"] == "Renamed Elsewhere"
+    
+    async def test_patch_invalidates_etag(self, client: AsyncClient, auth_headers: dict):
+        """Test an update changes the ETag and the old one no longer matches."""
+        # Arrange
+        old_etag = (await client.get("/users/me", headers=auth_headers)).headers["etag"]
+        await client.patch("/users/me", json={"full_name": "Renamed User"}, headers=auth_headers)
+        
+        # Act
+        response = await client.get("/users/me", headers={**auth_headers, "If-None-Match": old_etag})
+        
+        # Assert
+        assert response.status_code == 200
+        assert response.json()["full_name"] == "Renamed User"
+        assert response.headers["etag"] != old_etag
+    
+    async def test_update_user_profile_success(self, client: AsyncClient, auth_headers: dict):
+        """Test successful user profile update."""
+        # Arrange
+        update_data = {
+            "full_name": "Updated Name",
+            "bio": "Updated bio"
+        }
+        
+        # Act
+        response = await client.patch("/users/me", headers=auth_headers, json=update_data)
+        
+        # Assert
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert data["full_name"] == "Updated Name"
+        assert data["bio"] == "Updated bio"
+
+
+class TestBatchUserEndpointIntegration:
+    """
+    Integration tests for /users/batch.
+    
+    Runs the real bulk INSERT ... RETURNING path against the test database.
+    """
+    
+    async def test_bulk_create_reports_per_item_errors(
+        self, client: AsyncClient, superuser_headers: dict, authenticated_user
+    ):
+        """Test valid items are created and failures are reported by index."""
+        # Arrange
+        payload = {"users": [
+            {"email": "new@example.com", "username": "newuser", "password": "securepassword123"},
+            {"email": "new@example.com", "username": "another", "password": "securepassword123"},
+            {"email": authenticated_user.email, "username": "taken", "password": "securepassword123"},
+        ]}
+        
+        # Act
+        response = await client.post("/users/batch", json=payload, headers=superuser_headers)
+        
+        # Assert
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert [user["email"] for user in data["created"]] == ["new@example.com"]
+        assert [error["index"] for error in data["errors"]] == [1, 2]
+    
+    async def test_bulk_fetch_reports_missing_ids(
+        self, client: AsyncClient, superuser_headers: dict, authenticated_user
+    ):
+        """Test batch fetch returns found users and lists unknown IDs."""
+        # Act
+        response = await client.get(
+            "/users/batch",
+            params={"ids": [authenticated_user.id, 999_999]},
+            headers=superuser_headers,
+        )
+        
+        # Assert
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert [user["id"] for user in data["users"]] == [authenticated_user.id]
+        assert data["missing"] == [999_999]
+    
+    async def test_bulk_fetch_query_count_independent_of_size(
+        self, client: AsyncClient, superuser_headers: dict, authenticated_user, assert_max_queries
+    ):
+        """Test fetching many IDs stays one IN query, not one query per ID."""
+        # Arrange
+        ids = [authenticated_user.id, *range(100_000, 100_050)]
+        await client.get("/users/batch", params={"ids": ids[:1]}, headers=superuser_headers)  # warm auth cache
+        
+        # Act
+        with assert_max_queries(1) as log:
+            response = await client.get("/users/batch", params={"ids": ids}, headers=superuser_headers)
+        
+        # Assert
+        assert response.status_code == 200
+        assert log.repeated() == []
+    
+    async def test_bulk_fetch_rejects_too_many_ids(
+        self, client: AsyncClient, superuser_headers: dict, monkeypatch
+    ):
+        """Test GET /users/batch returns 413 above USER_BATCH_READ_MAX_IDS ids, like POST."""
+        # Arrange
+        monkeypatch.setattr(get_settings(), "USER_BATCH_READ_MAX_IDS", 2)
+        
+        # Act
+        response = await client.get("/users/batch", params={"ids": [1, 2, 3]}, headers=superuser_headers)
+        
+        # Assert
+        assert response.status_code == 413
+    
+    async def test_batch_requires_superuser(self, client: AsyncClient, auth_headers: dict):
+        """Test regular users cannot call batch endpoints."""
+        # Act
+        response = await client.post("/users/batch", json={"users": []}, headers=auth_headers)
+        
+        # Assert
+        assert response.status_code == 403
+
+
+class TestUserListingIntegration:
+    """
+    Integration tests for keyset-paginated listing and streaming export.
+    """
+    
+    async def test_cursor_pages_cover_all_users_once(
+        self, client: AsyncClient, superuser_headers: dict, authenticated_user
+    ):
+        """Test following next_cursor visits every user exactly once, in ID order."""
+        # Arrange
+        seen, cursor = [], None
+        
+        # Act
+        while True:
+            params = {"limit": 1, **({"cursor": cursor} if cursor else {})}
+            data = (await client.get("/users", params=params, headers=superuser_headers)).json()
+            seen.extend(user["id"] for user in data["users"])
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+        
+        # Assert
+        assert len(seen) == 2  # admin + authenticated_user
+        assert seen == sorted(set(seen))
+    
+    async def test_invalid_cursor_rejected(self, client: AsyncClient, superuser_headers: dict):
+        """Test malformed cursors return 400 instead of a server error."""
+        # Act
+        response = await client.get("/users", params={"cursor": "not-a-cursor"}, headers=superuser_headers)
+        
+        # Assert
+        assert response.status_code == 400
+    
+    async def test_export_streams_ndjson(
+        self, client: AsyncClient, superuser_headers: dict, authenticated_user
+    ):
+        """Test NDJSON export emits one JSON object per user."""
+        # Act
+        response = await client.get("/users/export", headers=superuser_headers)
+        
+        # Assert
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert authenticated_user.email in {row["email"] for row in rows}
+        assert "hashed_password" not in rows[0]
+    
+    async def test_export_streams_csv_with_header(
+        self, client: AsyncClient, superuser_headers: dict, authenticated_user
+    ):
+        """Test CSV export starts with a header row."""
+        # Act
+        response = await client.get("/users/export", params={"format": "csv"}, headers=superuser_headers)
+        
+        # Assert
+        lines = response.text.splitlines()
+        assert lines[0] == "id,email,username,full_name,is_active,created_at"
+        assert len(lines) == 3
+
+
+class TestCompiledUserLookups:
+    """Cached lambda statements bind each call's arguments, never the first call's."""
+    
+    async def test_lookups_bind_fresh_arguments(self, db_session, authenticated_user, superuser_headers):
+        """Test alternating lookups through one call site return the matching users."""
+        # Arrange
+        from src.services.user_service import UserService
+        service = UserService(db_session)
+        
+        # Act
+        by_id = [
+            await service.get_user_by_id(authenticated_user.id, use_cache=False),
+            await service.get_user_by_id(authenticated_user.id + 1000, use_cache=False),
+        ]
+        by_email = [
+            (await service.get_user_by_email(email, use_cache=False)).username
+            for email in (authenticated_user.email, "admin@example.com", authenticated_user.email.upper())
+        ]
+        
+        # Assert
+        assert by_id[0].id == authenticated_user.id
+        assert by_id[1] is None
+        assert by_email == [authenticated_user.username, "admin", authenticated_user.username]
+
+
+class TestReadReplicaRouting:
+    """
+    Replica routing against two SQLite files standing in for primary and replica.
+    
+    Each file holds user 1 under a different username, so the response
+    shows which database served the request. User 2 exists only on the
+    primary, as if just created.
+    """
+    
+    @pytest.fixture
+    async def routed(self, tmp_path, monkeypatch):
+        from fastapi import Depends, FastAPI
+        from httpx import ASGITransport
+        from sqlalchemy import insert, select, update
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        from src.core import database
+        from src.core.database import Base, DatabaseRoutingMiddleware, ReplicaRouter
+        from src.models.user import User
+        from src.services.user_cache import user_cache
+        from src.services.user_service import UserService
+        
+        engines = {}
+        for name in ("primary", "replica"):
+            engines[name] = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / name}.db")
+            async with engines[name].begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+                await conn.execute(insert(User).values(
+                    id=1, email=f"{name}@example.com", username=name, hashed_password="x"
+                ))
+        # User 2 was just created: the replica has not caught up yet
+        async with engines["primary"].begin() as conn:
+            await conn.execute(insert(User).values(
+                id=2, email="created@example.com", username="created", hashed_password="x"
+            ))
+        router = ReplicaRouter(engines["replica"], sticky_seconds=30, max_lag=1.0)
+        monkeypatch.setattr(database, "replica_router", router)
+        monkeypatch.setattr(
+            database, "AsyncSessionLocal", async_sessionmaker(engines["primary"], expire_on_commit=False)
+        )
+        
+        app = FastAPI()
+        app.add_middleware(DatabaseRoutingMiddleware, router=router)
+        
+        @app.get("/source")
+        async def read_source(db=Depends(database.get_db)):
+            return {"source": await db.scalar(select(User.username).where(User.id == 1))}
+        
+        @app.get("/users/{user_id}")
+        async def read_user(user_id: int, db=Depends(database.get_db)):
+            user = await UserService(db, cache=user_cache).get_user_by_id(user_id)
+            return {"username": user.username if user else None}
+        
+        @app.post("/source")
+        async def write_source(db=Depends(database.get_db)):
+            await db.execute(update(User).where(User.id == 1).values(full_name="written"))
+            await db.commit()
+            return {"source": await db.scalar(select(User.username).where(User.id == 1))}
+        
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            yield client, router
+        for engine in engines.values():
+            await engine.dispose()
+    
+    async def test_reads_use_replica_and_writes_primary(self, routed):
+        """Test GET is served by the replica and POST by the primary."""
+        # Arrange
+        client, _ = routed
+        
+        # Act
+        read = await client.get("/source")
+        write = await client.post("/source")
+        
+        # Assert
+        assert read.json() == {"source": "replica"}
+        assert write.json() == {"source": "primary"}
+    
+    async def test_write_makes_client_sticky(self, routed):
+        """Test reads after a write go to the primary, by token and by cookie."""
+        # Arrange
+        client, _ = routed
+        writer = {"Authorization": "Bearer writer"}
+        
+        # Act
+        write = await client.post("/source", headers=writer)
+        by_cookie = await client.get("/source")
+        client.cookies.clear()
+        by_token = await client.get("/source", headers=writer)
+        other_client = await client.get("/source", headers={"Authorization": "Bearer reader"})
+        
+        # Assert
+        assert "db_primary_until" in write.headers["set-cookie"]
+        assert by_cookie.json() == {"source": "primary"}
+        assert by_token.json() == {"source": "primary"}
+        assert other_client.json() == {"source": "replica"}
+    
+    async def test_cache_fill_never_reads_lagging_replica(self, routed):
+        """Test one client's replica read cannot cache stale data for another."""
+        # Arrange
+        client, _ = routed
+        
+        # Act
+        by_b = await client.get("/users/2", headers={"Authorization": "Bearer user-b"})
+        by_a = await client.get("/users/2", headers={"Authorization": "Bearer user-a"})
+        
+        # Assert
+        assert by_b.json() == {"username": "created"}
+        assert by_a.json() == {"username": "created"}
+    
+    async def test_lagging_replica_falls_back_to_primary(self, routed):
+        """Test reads move to the primary when measured lag exceeds the limit."""
+        # Arrange
+        client, router = routed
+        router.max_lag = -1.0  # SQLite reports zero lag; make any lag too much
+        
+        # Act
+        await router.check_lag()
+        response = await client.get("/source")
+        
+        # Assert
+        assert router.healthy is False
+        assert response.json() == {"source": "primary"}
+
+
+class TestUserActivityIntegration:
+    """Write-behind activity tracking through the API and the database."""
+    
+    async def test_login_is_buffered_not_written(
+        self, client: AsyncClient, authenticated_user, sample_user_data, activity_rows
+    ):
+        """Test login only records a delta; the flush writes it later."""
+        # Arrange
+        from src.services.user_activity import user_activity
+        form = {"username": sample_user_data["email"], "password": sample_user_data["password"]}
+        
+        # Act
+        response = await client.post("/auth/token", data=form)
+        pending = user_activity.pending
+        written = await user_activity.flush()
+        
+        # Assert
+        assert response.status_code == 200
+        assert pending == 1
+        assert written == 1
+        assert activity_rows[0]["user_id"] == authenticated_user.id
+        assert activity_rows[0]["logins"] == 1
+    
+    async def test_flush_updates_rows_in_one_batch(self, db_session, authenticated_user):
+        """Test coalesced deltas land as last_seen_at and an incremented login_count."""
+        # Arrange
+        from sqlalchemy.ext.asyncio import AsyncSession
+        from src.services.user_activity import UserActivityBuffer
+        buffer = UserActivityBuffer(
+            lambda: AsyncSession(bind=db_session.bind, join_transaction_mode="create_savepoint")
+        )
+        buffer.record_login(authenticated_user.id)
+        buffer.record_login(authenticated_user.id)
+        buffer.touch(authenticated_user.id)
+        
+        # Act
+        written = await buffer.flush()
+        await db_session.refresh(authenticated_user)
+        
+        # Assert
+        assert written == 1
+        assert authenticated_user.login_count == 2
+        assert authenticated_user.last_seen_at is not None
+        assert buffer.pending == 0
+
+
+# File: tests/test_patterns/test_async_patterns.py
+import pytest
+import asyncio
+from httpx import AsyncClient
+
+
+class TestAsyncEndpoints:
+    """
+    Test patterns for async endpoint testing.
+    
+    Demonstrates proper async test setup and execution
+    for async FastAPI endpoints.
+    """
+    
+    @pytest.mark.asyncio
+    async def test_async_health_endpoint(self, client: AsyncClient):
+        """Test health endpoint using async client."""
+        # Act
+        response = await client.get("/health")
+        
+        # Assert
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert data["status"] == "healthy"
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_requests(self, client: AsyncClient):
+        """Test handling of concurrent requests."""
+        # Arrange
+        num_requests = 5
+        
+        # Act - Send multiple concurrent requests
+        tasks = [
+            client.get("/health")
+            for _ in range(num_requests)
+        ]
+        responses = await asyncio.gather(*tasks)
+        
+        # Assert
+        assert len(responses) == num_requests
+        for response in responses:
+            assert response.status_code == 200
+            assert response.json()["status"] == "healthy"
+
+
+# File: tests/test_patterns/test_mock_patterns.py
+import pytest
+from unittest.mock import Mock, patch, AsyncMock
+import asyncio
+
+from src.core.rate_limit import RateLimiter, RateLimitRule
+from src.services.cache_service import CacheService
+from src.services.email_service import EmailJob, EmailQueue, SMTPTransport
+
+
+class TestMockingPatterns:
+    """
+    Demonstrate effective mocking patterns for testing.
+    
+    Shows how to mock external dependencies, async functions,
+    and database operations.
+    """
+    
+    @patch('src.services.email_service.EmailService.send_email')
+    async def test_mock_external_service(self, mock_send_email):
+        """Test mocking external email service."""
+        # Arrange
+        mock_send_email.return_value = {"status": "sent", "message_id": "123"}
+        
+        from src.services.email_service import EmailService
+        email_service = EmailService()
+        
+        # Act
+        result = await email_service.send_welcome_email("test@example.com")
+        
+        # Assert
+        mock_send_email.assert_called_once_with(
+            to="test@example.com",
+            template="welcome",
+            context={}
+        )
+        assert result["status"] == "sent"
+    
+    @patch('src.core.redis.Redis')
+    async def test_mock_redis_cache(self, mock_redis_class):
+        """Test mocking Redis cache operations."""
+        # Arrange
+        mock_redis = AsyncMock()
+        mock_redis_class.return_value = mock_redis
+        mock_redis.get.return_value = '{"cached": "data"}'
+        
+        from src.services.cache_service import CacheService
+        cache_service = CacheService()
+        
+        # Act
+        result = await cache_service.get("test_key")
+        
+        # Assert
+        mock_redis.get.assert_called_once_with("test_key")
+        assert result == {"cached": "data"}
+    
+    def test_mock_database_session(self):
+        """Test mocking async database session operations."""
+        # Arrange
+        mock_session = AsyncMock()
+        mock_result = Mock()
+        mock_result.scalar_one_or_none.return_value = None
+        mock_session.execute.return_value = mock_result
+        
+        from src.services.user_service import UserService
+        service = UserService(mock_session)
+        
+        # Act
+        result = asyncio.run(service.get_user_by_email("test@example.com"))
+        
+        # Assert
+        assert result is None
+        mock_session.execute.assert_awaited_once()
+
+
+class TestCacheStampedeProtection:
+    """
+    Behavioural tests for CacheService.get_or_compute.
+    
+    Uses the FakeRedis stand-in so locking and expiry run for real.
+    """
+    
+    @pytest.fixture
+    def counting_compute(self):
+        calls = []
+        
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"value": len(calls)}
+        
+        compute.calls = calls
+        return compute
+    
+    async def test_concurrent_misses_compute_once(self, cache_service, counting_compute):
+        """Test concurrent misses in one process share a single compute."""
+        # Act
+        results = await asyncio.gather(*[
+            cache_service.get_or_compute("hot_key", counting_compute, ttl=60)
+            for _ in range(100)
+        ])
+        
+        # Assert
+        assert len(counting_compute.calls) == 1
+        assert all(result == {"value": 1} for result in results)
+    
+    async def test_lock_coordinates_processes(self, fake_redis, counting_compute):
+        """Test lock=True lets only one of several processes compute."""
+        # Arrange - separate CacheService instances model separate workers
+        workers = [CacheService(client=fake_redis) for _ in range(3)]
+        
+        # Act
+        results = await asyncio.gather(*[
+            worker.get_or_compute("hot_key", counting_compute, ttl=60, lock=True)
+            for worker in workers
+        ])
+        
+        # Assert
+        assert len(counting_compute.calls) == 1
+        assert results == [{"value": 1}] * 3
+    
+    async def test_early_refresh_before_expiry(self, cache_service, counting_compute):
+        """Test a near-expiry entry is recomputed before it lapses."""
+        # Arrange
+        await cache_service.get_or_compute("hot_key", counting_compute, ttl=60, beta=0)
+        
+        # Act - draw the largest possible jitter
+        with patch("src.services.cache_service.random.random", return_value=1.0 - 1e-12):
+            result = await cache_service.get_or_compute("hot_key", counting_compute, ttl=60, beta=1000)
+        
+        # Assert
+        assert result == {"value": 2}
+    
+    async def test_fresh_entry_not_refreshed(self, cache_service, counting_compute):
+        """Test disabled early refresh serves the cached value."""
+        # Act
+        await cache_service.get_or_compute("hot_key", counting_compute, ttl=60)
+        result = await cache_service.get_or_compute("hot_key", counting_compute, ttl=60, beta=0)
+        
+        # Assert
+        assert result == {"value": 1}
+        assert len(counting_compute.calls) == 1
+    
+    async def test_compute_errors_reach_all_waiters(self, cache_service):
+        """Test a failing compute raises for every coalesced caller and caches nothing."""
+        # Arrange
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("backend down")
+        
+        # Act
+        results = await asyncio.gather(
+            *[cache_service.get_or_compute("hot_key", failing) for _ in range(5)],
+            return_exceptions=True,
+        )
+        
+        # Assert
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert await cache_service.get("hot_key") is None
+    
+    async def test_cancelled_leader_does_not_fail_waiters(self, cache_service, counting_compute):
+        """Test cancelling the computing caller leaves coalesced callers to finish."""
+        # Arrange
+        leader = asyncio.create_task(cache_service.get_or_compute("hot_key", counting_compute, ttl=60))
+        await asyncio.sleep(0)  # leader registers the in-flight compute
+        followers = [
+            asyncio.create_task(cache_service.get_or_compute("hot_key", counting_compute, ttl=60))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0)  # followers wait on the leader
+        
+        # Act
+        leader.cancel()
+        results = await asyncio.gather(*followers)
+        
+        # Assert
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert results == [{"value": 2}] * 3
+        assert len(counting_compute.calls) == 2
+
+
+async def eventually(predicate, timeout: float = 2.0) -> None:
+    """Poll until predicate() is true or fail after timeout."""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "condition not met in time"
+        await asyncio.sleep(0.01)
+
+
+class TestRateLimiter:
+    """
+    Behavioural tests for local buckets and shared-window reconciliation.
+    
+    Two limiters on one FakeRedis stand in for two workers.
+    """
+    
+    RULES = {"/auth/token": RateLimitRule(limit=5, window=60)}
+    
+    def test_local_bucket_rejects_after_limit(self):
+        """Test a bucket admits its capacity, then reports a wait."""
+        # Arrange
+        limiter = RateLimiter(self.RULES, backend=None)
+        
+        # Act
+        waits = [limiter.hit("/auth/token", "10.0.0.1") for _ in range(6)]
+        
+        # Assert
+        assert waits[:5] == [0.0] * 5
+        assert waits[5] > 0
+        assert limiter.hit("/auth/token", "10.0.0.2") == 0.0  # other clients unaffected
+        assert limiter.hit("/users/me", "10.0.0.1") == 0.0  # no rule, no limit
+    
+    async def test_sync_shares_budget_across_workers(self, cache_service):
+        """Test traffic admitted by one worker blocks the client on another."""
+        # Arrange
+        worker_a = RateLimiter(self.RULES, backend=cache_service)
+        worker_b = RateLimiter(self.RULES, backend=cache_service)
+        for _ in range(5):
+            worker_a.hit("/auth/token", "10.0.0.1")
+        worker_b.hit("/auth/token", "10.0.0.1")
+        
+        # Act
+        await worker_a.sync()
+        await worker_b.sync()
+        
+        # Assert
+        assert worker_b.hit("/auth/token", "10.0.0.1") > 0
+    
+    async def test_backend_failure_keeps_local_limits(self, cache_service, fake_redis):
+        """Test an unavailable backend neither raises nor blocks clients."""
+        # Arrange
+        from redis.exceptions import ConnectionError
+        fake_redis.incrby = AsyncMock(side_effect=ConnectionError("down"))
+        limiter = RateLimiter(self.RULES, backend=cache_service)
+        limiter.hit("/auth/token", "10.0.0.1")
+        
+        # Act
+        await limiter.sync()
+        
+        # Assert
+        assert limiter.hit("/auth/token", "10.0.0.1") == 0.0
+
+
+class TestEmailQueue:
+    """
+    Behavioural tests for the background email queue.
+    
+    Delivery goes through the real SMTPTransport to a local fake SMTP
+    server; spooling uses a temporary directory.
+    """
+    
+    @pytest.fixture
+    def make_queue(self, smtp_server, tmp_path):
+        def factory(**overrides):
+            options = {"batch_window": 0.05, "retry_base_delay": 0.01, **overrides}
+            transport = options.pop("transport", None) or SMTPTransport("127.0.0.1", smtp_server.port)
+            return EmailQueue(transport, tmp_path / "spool", **options)
+        return factory
+    
+    async def test_batch_delivered_over_one_connection(self, make_queue, smtp_server, tmp_path):
+        """Test queued jobs share one SMTP session and leave no spool files."""
+        # Arrange
+        queue = make_queue()
+        for n in range(5):
+            await queue.enqueue(EmailJob(to=f"user{n}@example.com", template="welcome"))
+        
+        # Act
+        await queue.start()
+        await queue.stop(timeout=5)
+        
+        # Assert
+        assert sorted(message["To"] for message in smtp_server.messages) == [
+            f"user{n}@example.com" for n in range(5)
+        ]
+        assert smtp_server.connections == 1
+        assert list((tmp_path / "spool").glob("*.json")) == []
+    
+    async def test_transient_failure_retried(self, make_queue, smtp_server):
+        """Test a 451 from the server is retried after backoff."""
+        # Arrange
+        smtp_server.fail_next = 1
+        queue = make_queue()
+        await queue.start()
+        
+        # Act
+        await queue.enqueue(EmailJob(to="retry@example.com", template="welcome"))
+        await eventually(lambda: queue.metrics.sent == 1)
+        await queue.stop()
+        
+        # Assert
+        assert queue.metrics.retried == 1
+        assert [message["To"] for message in smtp_server.messages] == ["retry@example.com"]
+    
+    async def test_spooled_jobs_survive_restart(self, make_queue, smtp_server):
+        """Test jobs enqueued before a crash are delivered by the next process."""
+        # Arrange
+        await make_queue().enqueue(EmailJob(to="later@example.com", template="welcome"))
+        restarted = make_queue()
+        
+        # Act
+        await restarted.start()
+        await restarted.stop(timeout=5)
+        
+        # Assert
+        assert [message["To"] for message in smtp_server.messages] == ["later@example.com"]
+    
+    async def test_orphaned_spool_adopted(self, make_queue, smtp_server, tmp_path):
+        """Test jobs left by a worker slot that no longer exists are delivered."""
+        # Arrange
+        old_worker = EmailQueue(AsyncMock(), tmp_path / "worker-3")
+        await old_worker.enqueue(EmailJob(to="orphan@example.com", template="welcome"))
+        queue = make_queue()
+        queue.orphan_dirs = [tmp_path / "worker-3"]
+        
+        # Act
+        await queue.start()
+        await queue.stop(timeout=5)
+        
+        # Assert
+        assert [message["To"] for message in smtp_server.messages] == ["orphan@example.com"]
+        assert list((tmp_path / "worker-3").glob("*.json")) == []
+    
+    async def test_restart_after_stop(self, make_queue, smtp_server):
+        """Test a stopped queue starts again with a fresh queue and delivers."""
+        # Arrange
+        queue = make_queue()
+        await queue.start()
+        await queue.stop()
+        
+        # Act
+        await queue.start()
+        await queue.enqueue(EmailJob(to="again@example.com", template="welcome"))
+        await queue.stop(timeout=5)
+        
+        # Assert
+        assert [message["To"] for message in smtp_server.messages] == ["again@example.com"]
+    
+    async def test_exhausted_jobs_moved_to_dead_letters(self, make_queue, tmp_path):
+        """Test jobs that keep failing stop retrying and are kept for inspection."""
+        # Arrange
+        transport = AsyncMock()
+        transport.send_batch.side_effect = ConnectionError("provider down")
+        queue = make_queue(transport=transport, max_attempts=2)
+        await queue.start()
+        
+        # Act
+        job = await queue.enqueue(EmailJob(to="lost@example.com", template="welcome"))
+        await eventually(lambda: queue.metrics.dead == 1)
+        await queue.stop()
+        
+        # Assert
+        assert transport.send_batch.await_count == 2
+        assert (tmp_path / "spool" / "dead" / f"{job.id}.json").exists()
+
+
+# File: tests/test_patterns/test_performance_patterns.py
+import pytest
+
+from tests.benchmarks.loadtest import ENDPOINTS, run_load
+from tests.benchmarks.memprofile import profile_endpoint
+
+
+class TestPerformancePatterns:
+    """
+    Performance testing patterns and benchmarks.
+    
+    Latency is judged as a distribution from the load-test harness,
+    never from a single wall-clock sample. Regressions against stored
+    baselines are checked only by `python -m tests.benchmarks.loadtest`,
+    which records and compares runs with the same transport and app.
+    """
+    
+    async def test_concurrent_load(self, client):
+        """Test /health serves concurrent load without errors."""
+        # Act
+        result = await run_load(client, ENDPOINTS["health"], requests=500, concurrency=25)
+        
+        # Assert
+        assert result.errors == 0
+        assert result.requests == 500
+        assert result.p50_ms <= result.p95_ms <= result.p99_ms
+    
+    @pytest.mark.performance
+    async def test_no_per_request_memory_growth(self, client):
+        """Test /health retains no memory per request once warmed up."""
+        # Act
+        report = await profile_endpoint(client, "health", ENDPOINTS["health"], requests=300)
+        
+        # Assert
+        assert not report.leaking, report.format()
+
+
+# File: tests/benchmarks/loadtest.py
+"""
+Load-test harness with JSON baselines and regression detection.
+
+Drives the app in-process (ASGITransport) or over a local uvicorn socket
+at a fixed concurrency, then reports throughput and p50/p95/p99 per
+endpoint. Run with:
+
+    python -m tests.benchmarks.loadtest --transport socket --concurrency 50
+    python -m tests.benchmarks.loadtest --save-baseline
+
+A run fails (exit 1) when an endpoint's latencies are significantly
+worse than the stored baseline: one-sided Mann-Whitney U p < alpha and
+a median slowdown above --min-slowdown.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional
+
+from httpx import ASGITransport, AsyncClient, Limits
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+BENCH_DATABASE_URL = "sqlite+aiosqlite:///./bench.db"
+BENCH_USER = {"email": "bench@example.com", "username": "bench", "password": "benchpassword123"}
+MAX_STORED_SAMPLES = 1000
+
+
+@dataclass
+class Endpoint:
+    method: str
+    path: str
+    needs_token: bool = False
+    form: Optional[dict] = None
+
+
+ENDPOINTS = {
+    "health": Endpoint("GET", "/health"),
+    "users_me": Endpoint("GET", "/users/me", needs_token=True),
+    "auth": Endpoint("POST", "/auth/token", form={
+        "username": BENCH_USER["email"], "password": BENCH_USER["password"],
+    }),
+}
+
+
+@dataclass
+class LoadResult:
+    requests: int
+    concurrency: int
+    errors: int
+    duration_s: float
+    throughput_rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    samples_ms: List[float] = field(repr=False)
+
+
+def percentile(samples: list, pct: float) -> float:
+    """Nearest-rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+async def run_load(
+    client: AsyncClient,
+    endpoint: Endpoint,
+    requests: int,
+    concurrency: int,
+    headers: Optional[dict] = None,
+) -> LoadResult:
+    """Issue requests from `concurrency` workers and summarize latencies."""
+    latencies: List[float] = []
+    errors = 0
+    remaining = requests
+
+    async def worker() -> None:
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            response = await client.request(endpoint.method, endpoint.path, headers=headers, data=endpoint.form)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - started
+
+    return LoadResult(
+        requests=len(latencies),
+        concurrency=concurrency,
+        errors=errors,
+        duration_s=duration,
+        throughput_rps=len(latencies) / duration,
+        p50_ms=percentile(latencies, 50),
+        p95_ms=percentile(latencies, 95),
+        p99_ms=percentile(latencies, 99),
+        samples_ms=latencies,
+    )
+
+
+def mann_whitney_p(baseline: List[float], current: List[float]) -> float:
+    """
+    One-sided p-value that current samples are larger than baseline.
+
+    Normal approximation with tie and continuity correction; adequate
+    for the hundreds of samples a load run produces.
+    """
+    n1, n2 = len(baseline), len(current)
+    combined = sorted([(value, 0) for value in baseline] + [(value, 1) for value in current])
+    rank_sum, tie_term, i = 0.0, 0, 0
+    while i < len(combined):
+        j = i
+        while j + 1 < len(combined) and combined[j + 1][0] == combined[i][0]:
+            j += 1
+        average_rank = (i + j) / 2 + 1
+        rank_sum += average_rank * sum(1 for k in range(i, j + 1) if combined[k][1] == 1)
+        tied = j - i + 1
+        tie_term += tied ** 3 - tied
+        i = j + 1
+
+    u = rank_sum - n2 * (n2 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def find_regressions(
+    results: Dict[str, LoadResult],
+    baseline: Dict[str, dict],
+    alpha: float = 0.01,
+    min_slowdown: float = 0.10,
+) -> List[str]:
+    """Describe endpoints that are both significantly and materially slower."""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        p_value = mann_whitney_p(previous["samples_ms"], result.samples_ms)
+        slowdown = result.p50_ms / previous["p50_ms"] - 1
+        if p_value < alpha and slowdown > min_slowdown:
+            regressions.append(
+                f"{name}: p50 {previous['p50_ms']:.2f}ms -> {result.p50_ms:.2f}ms "
+                f"(+{slowdown:.0%}, p={p_value:.2g})"
+            )
+    return regressions
+
+
+def load_baseline(path: Path) -> Optional[Dict[str, dict]]:
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())["endpoints"]
+
+
+def save_baseline(path: Path, results: Dict[str, LoadResult]) -> None:
+    """Store summaries plus a bounded random sample of latencies."""
+    endpoints = {}
+    for name, result in results.items():
+        data = asdict(result)
+        samples = data["samples_ms"]
+        data["samples_ms"] = random.sample(samples, min(len(samples), MAX_STORED_SAMPLES))
+        endpoints[name] = data
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"recorded_at": time.time(), "endpoints": endpoints}, indent=2))
+
+
+async def prepare_database() -> None:
+    """Create the schema and benchmark user in the bench database."""
+    from src.core.database import AsyncSessionLocal, Base, engine
+    from src.schemas.user import UserCreate
+    from src.services.user_service import UserService
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as session:
+        service = UserService(session)
+        if await service.get_user_by_email(BENCH_USER["email"]) is None:
+            await service.create_user(UserCreate(**BENCH_USER))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_until_ready(client: AsyncClient, timeout: float = 15.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("server did not become ready")
+
+
+@asynccontextmanager
+async def target_client(
+    transport: str, concurrency: int, workers: Optional[int] = None
+) -> AsyncIterator[AsyncClient]:
+    """
+    Yield a client for a ready app: in-process with its lifespan running,
+    or a server subprocess on a free local port (plain uvicorn, or the
+    pre-fork launcher when workers is given).
+    """
+    await prepare_database()
+    limits = Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    if transport == "inprocess":
+        from src.main import create_app
+
+        app = create_app()
+        async with app.router.lifespan_context(app):
+            async with AsyncClient(
+                transport=ASGITransport(app=app), base_url="http://bench", limits=limits, timeout=30.0
+            ) as client:
+                yield client
+        return
+
+    port = free_port()
+    if workers is None:
+        command = ["-m", "uvicorn", "src.main:app", "--log-level", "warning"]
+    else:
+        command = ["-m", "src.serve", "--workers", str(workers)]
+    server = subprocess.Popen(
+        [sys.executable, *command, "--host", "127.0.0.1", "--port", str(port)],
+        env={**os.environ, "WEB_LOG_LEVEL": "warning"},
+    )
+    try:
+        async with AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=30.0) as client:
+            await wait_until_ready(client)
+            yield client
+    finally:
+        server.terminate()
+        server.wait()
+
+
+async def login(client: AsyncClient) -> dict:
+    """Bearer headers for the benchmark user."""
+    response = await client.post("/auth/token", data=ENDPOINTS["auth"].form)
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def run_suite(
+    transport: str, names: List[str], requests: int, concurrency: int, workers: Optional[int] = None
+) -> Dict[str, LoadResult]:
+    """Load each endpoint in turn after a short warm-up."""
+    async with target_client(transport, concurrency, workers) as client:
+        auth_headers = await login(client)
+        results = {}
+        for name in names:
+            endpoint = ENDPOINTS[name]
+            headers = auth_headers if endpoint.needs_token else None
+            await run_load(client, endpoint, min(requests, 100), concurrency, headers)
+            results[name] = await run_load(client, endpoint, requests, concurrency, headers)
+        return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test endpoints against a stored baseline")
+    parser.add_argument("--transport", choices=["inprocess", "socket"], default="inprocess")
+    parser.add_argument("--endpoints", nargs="+", choices=list(ENDPOINTS), default=list(ENDPOINTS))
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=25)
+    parser.add_argument("--workers", type=int, help="socket transport via python -m src.serve")
+    parser.add_argument("--alpha", type=float, default=0.01)
+    parser.add_argument("--min-slowdown", type=float, default=0.10)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    # Must be set before src.core.database creates the engine
+    os.environ.setdefault("DATABASE_URL", BENCH_DATABASE_URL)
+    # The auth endpoint is loaded far past its production login budget
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    if args.workers is not None and args.transport != "socket":
+        parser.error("--workers requires --transport socket")
+    results = asyncio.run(
+        run_suite(args.transport, args.endpoints, args.requests, args.concurrency, args.workers)
+    )
+
+    print(f"{'endpoint':<10} {'rps':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for name, result in results.items():
+        print(
+            f"{name:<10} {result.throughput_rps:9.1f} {result.p50_ms:8.2f} "
+            f"{result.p95_ms:8.2f} {result.p99_ms:8.2f} {result.errors:7d}"
+        )
+
+    suffix = f"-{args.workers}w" if args.workers is not None else ""
+    baseline_path = BASELINE_DIR / f"{args.transport}{suffix}.json"
+    baseline = load_baseline(baseline_path)
+    regressions = find_regressions(results, baseline, args.alpha, args.min_slowdown) if baseline else []
+    for line in regressions:
+        print(f"REGRESSION {line}")
+
+    if args.save_baseline and not regressions:
+        save_baseline(baseline_path, results)
+        print(f"baseline written to {baseline_path}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
+
+
+# File: tests/benchmarks/memprofile.py
+"""
+Per-endpoint allocation tracking with tracemalloc.
+
+For each endpoint: warm up (caches and pools fill here), then run two
+equal steady-state windows. Growth in both windows is retained memory
+per request; a leak is consistent growth above the threshold. Run with:
+
+    python -m tests.benchmarks.memprofile [--requests 500] [--top 10]
+"""
+import argparse
+import asyncio
+import gc
+import os
+import tracemalloc
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from httpx import AsyncClient
+
+from tests.benchmarks.loadtest import BENCH_DATABASE_URL, ENDPOINTS, Endpoint, login, target_client
+
+# Allocations made by the harness itself are not the app's
+HARNESS_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+]
+
+
+@dataclass
+class MemoryReport:
+    endpoint: str
+    requests: int
+    warmup_bytes_per_request: float
+    first_window_bytes_per_request: float
+    second_window_bytes_per_request: float
+    top_sites: List[Tuple[str, int, int]]  # (call site, bytes retained, allocations)
+    leak_threshold: float
+
+    @property
+    def retained_bytes_per_request(self) -> float:
+        return self.second_window_bytes_per_request
+
+    @property
+    def leaking(self) -> bool:
+        """Both steady windows grew past the threshold."""
+        return min(self.first_window_bytes_per_request, self.second_window_bytes_per_request) > self.leak_threshold
+
+    def format(self) -> str:
+        lines = [
+            f"{self.endpoint}: warm-up {self.warmup_bytes_per_request:.0f} B/req, "
+            f"steady {self.first_window_bytes_per_request:.0f} / {self.second_window_bytes_per_request:.0f} B/req"
+            + ("  LEAK" if self.leaking else ""),
+        ]
+        lines += [f"  {size:>10} B {count:>7}x  {site}" for site, size, count in self.top_sites]
+        return "\n".join(lines)
+
+
+def _snapshot() -> tracemalloc.Snapshot:
+    gc.collect()
+    return tracemalloc.take_snapshot().filter_traces(HARNESS_FILTERS)
+
+
+def _growth(after: tracemalloc.Snapshot, before: tracemalloc.Snapshot) -> int:
+    return sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+
+async def _drive(client: AsyncClient, endpoint: Endpoint, requests: int, headers: Optional[dict]) -> None:
+    for _ in range(requests):
+        response = await client.request(endpoint.method, endpoint.path, headers=headers, data=endpoint.form)
+        response.raise_for_status()
+
+
+async def profile_endpoint(
+    client: AsyncClient,
+    name: str,
+    endpoint: Endpoint,
+    requests: int = 500,
+    headers: Optional[dict] = None,
+    warmup: int = 100,
+    top: int = 10,
+    frames: int = 8,
+    leak_threshold: float = 64.0,
+) -> MemoryReport:
+    """Profile one endpoint's allocations; requests are issued sequentially."""
+    tracemalloc.start(frames)
+    try:
+        baseline = _snapshot()
+        await _drive(client, endpoint, warmup, headers)
+        warmed = _snapshot()
+        await _drive(client, endpoint, requests, headers)
+        first = _snapshot()
+        await _drive(client, endpoint, requests, headers)
+        second = _snapshot()
+    finally:
+        tracemalloc.stop()
+
+    sites = []
+    for stat in second.compare_to(warmed, "traceback")[:top]:
+        if stat.size_diff <= 0:
+            continue
+        frame = stat.traceback[0]
+        sites.append((f"{frame.filename}:{frame.lineno}", stat.size_diff, stat.count_diff))
+
+    return MemoryReport(
+        endpoint=name,
+        requests=requests,
+        warmup_bytes_per_request=_growth(warmed, baseline) / warmup,
+        first_window_bytes_per_request=_growth(first, warmed) / requests,
+        second_window_bytes_per_request=_growth(second, first) / requests,
+        top_sites=sites,
+        leak_threshold=leak_threshold,
+    )
+
+
+async def main(names: List[str], requests: int, top: int) -> bool:
+    async with target_client("inprocess", concurrency=1) as client:
+        auth_headers = await login(client)
+        reports = [
+            await profile_endpoint(
+                client, name, ENDPOINTS[name], requests,
+                headers=auth_headers if ENDPOINTS[name].needs_token else None, top=top,
+            )
+            for name in names
+        ]
+    for report in reports:
+        print(report.format())
+    return any(report.leaking for report in reports)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-endpoint tracemalloc profile")
+    parser.add_argument("--endpoints", nargs="+", choices=list(ENDPOINTS), default=list(ENDPOINTS))
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", BENCH_DATABASE_URL)
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    raise SystemExit(1 if asyncio.run(main(args.endpoints, args.requests, args.top)) else 0)
+
+
+# File: tests/benchmarks/bench_json_responses.py
+"""
+Compare the default JSONResponse with FastJSONResponse.
+
+Drives the ASGI app in-process so only application and serialization
+cost is measured. Only routes whose bodies the response mode renders
+are loaded: /users/me hands a model to model_response() and
+/health/db-pool returns a dict to the default response class. /health
+(pre-rendered bytes) and the /users list and batch routes (bodies built
+by records_json) are identical in both modes. Run with:
+
+    python -m tests.benchmarks.bench_json_responses [requests]
+"""
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime
+
+from httpx import ASGITransport, AsyncClient
+
+from src.core.auth import get_token_claims
+from src.core.config import get_settings
+from src.main import create_app
+from src.models.user import User
+from src.schemas.user import UserResponse
+from src.services.profile_cache import profile_cache
+from src.services.user_service import get_user_service
+from tests.benchmarks.loadtest import percentile
+
+ENDPOINTS = ["/users/me", "/health/db-pool"]
+WARMUP_REQUESTS = 50
+
+
+class CachedUsers:
+    """UserService stand-in that always finds the same active user."""
+    
+    def __init__(self, user: User):
+        self.user = user
+    
+    async def get_user_by_id(self, user_id: int, **kwargs) -> User:
+        return self.user
+
+
+def build_app(fast_json: bool):
+    """Create an app with the response mode set and auth stubbed out."""
+    os.environ["FAST_JSON_RESPONSES"] = "true" if fast_json else "false"
+    get_settings.cache_clear()
+    
+    app = create_app()
+    profile = UserResponse(
+        id=1,
+        email="bench@example.com",
+        username="bench",
+        full_name="Bench User",
+        is_active=True,
+        created_at=datetime.utcnow(),
+    )
+    # Embedded-profile claims: /users/me serializes on every request, no DB or Redis
+    claims = {"sub": "1", "profile": profile.model_dump(mode="json")}
+    app.dependency_overrides[get_token_claims] = lambda: claims
+    # The active-user check, answered as a warm user cache would
+    app.dependency_overrides[get_user_service] = lambda: CachedUsers(User(**profile.model_dump()))
+    profile_cache.backend = None
+    return app
+
+
+async def measure(app, path: str, requests: int) -> dict:
+    """Issue sequential requests and return latency percentiles and CPU cost."""
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        for _ in range(WARMUP_REQUESTS):
+            await client.get(path)
+        
+        latencies = []
+        cpu_start = time.process_time()
+        for _ in range(requests):
+            start = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200
+        cpu_seconds = time.process_time() - cpu_start
+    
+    return {
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "cpu_us_per_request": cpu_seconds / requests * 1_000_000,
+    }
+
+
+async def main(requests: int) -> None:
+    for fast_json in (False, True):
+        label = "FastJSONResponse" if fast_json else "JSONResponse"
+        app = build_app(fast_json)
+        for path in ENDPOINTS:
+            result = await measure(app, path, requests)
+            print(
+                f"{label:<17} {path:<16} "
+                f"p50={result['p50_ms']:.3f}ms p99={result['p99_ms']:.3f}ms "
+                f"cpu={result['cpu_us_per_request']:.1f}us/req"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
+
+
+# File: tests/benchmarks/bench_read_models.py
+"""
+Compare ORM + pydantic reads with UserRecord read models.
+
+Both paths load the same rows from an in-memory SQLite database and
+encode them to response JSON; the report gives objects/sec for the
+full path and retained bytes per loaded object. Run with:
+
+    python -m tests.benchmarks.bench_read_models [rows]
+"""
+import asyncio
+import gc
+import sys
+import time
+import tracemalloc
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from src.core.database import Base
+from src.models.user import User
+from src.schemas.user import UserRecord, UserResponse, records_json
+from src.services.user_service import RECORD_COLUMNS
+
+ROUNDS = 5
+
+
+async def orm_load(session: AsyncSession) -> list:
+    session.expunge_all()
+    return list(await session.scalars(select(User)))
+
+
+def orm_encode(users: list) -> bytes:
+    return b"[" + b",".join(UserResponse.model_validate(user).model_dump_json().encode() for user in users) + b"]"
+
+
+async def record_load(session: AsyncSession) -> list:
+    return [UserRecord.from_row(row) for row in await session.execute(select(*RECORD_COLUMNS))]
+
+
+PATHS = {
+    "orm+pydantic": (orm_load, orm_encode),
+    "UserRecord": (record_load, records_json),
+}
+
+
+async def seed(session: AsyncSession, rows: int) -> None:
+    await session.execute(
+        insert(User),
+        [
+            {
+                "email": f"user{i}@example.com",
+                "username": f"user{i}",
+                "full_name": f"User {i}",
+                "hashed_password": "x" * 60,
+                "is_active": True,
+            }
+            for i in range(rows)
+        ],
+    )
+    await session.commit()
+
+
+async def objects_per_second(session: AsyncSession, load, encode, rows: int) -> float:
+    """Best-of-ROUNDS throughput for load + encode."""
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        encode(await load(session))
+        best = min(best, time.perf_counter() - start)
+    return rows / best
+
+
+async def bytes_per_object(session: AsyncSession, load, rows: int) -> float:
+    """Memory held by the loaded objects (and session state) per row."""
+    session.expunge_all()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    loaded = await load(session)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    retained = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del loaded
+    return retained / rows
+
+
+async def main(rows: int) -> None:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        await seed(session, rows)
+        for label, (load, encode) in PATHS.items():
+            rate = await objects_per_second(session, load, encode, rows)
+            size = await bytes_per_object(session, load, rows)
+            print(f"{label:<13} {rate:>12,.0f} objects/s {size:>8,.0f} bytes/object")
+    
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000))
+
+
+# File: tests/benchmarks/bench_compiled_queries.py
+"""
+Per-call CPU of UserService lookups: lambda statements vs. plain select().
+
+"select, no cache" compiles on every call (pre-1.4 behaviour),
+"select" rebuilds the statement and its cache key on every call, and
+"lambda_stmt" is what UserService runs now. The select modes build the
+same statements the service ships. Rows come from in-memory SQLite, so
+database time is small and equal across modes; password hashes use
+bcrypt cost 4 so the authenticate() row is not all hashing. Run with:
+
+    python -m tests.benchmarks.bench_compiled_queries [calls]
+"""
+import asyncio
+import sys
+import time
+
+from passlib.context import CryptContext
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from src.core.database import Base
+from src.core.security import verify_password
+from src.models.user import User
+from src.services.user_service import UserService
+
+USERS = 1000
+EMAIL = "user{}@example.com"
+PASSWORD = "benchmark-password"
+
+
+async def lookup_by_id(session, service, i, execution_options):
+    if service is not None:
+        return await service.get_user_by_id(i, use_cache=False)
+    result = await session.execute(select(User).where(User.id == i), execution_options=execution_options)
+    return result.scalar_one_or_none()
+
+
+async def lookup_by_email(session, service, i, execution_options):
+    if service is not None:
+        return await service.get_user_by_email(EMAIL.format(i), use_cache=False)
+    stmt = select(User).where(User.email == EMAIL.format(i))
+    result = await session.execute(stmt, execution_options=execution_options)
+    return result.scalar_one_or_none()
+
+
+async def authenticate(session, service, i, execution_options):
+    if service is not None:
+        return await service.authenticate(EMAIL.format(i), PASSWORD)
+    user = await lookup_by_email(session, None, i, execution_options)
+    return user if user is not None and verify_password(PASSWORD, user.hashed_password) else None
+
+
+# (name, function)
+LOOKUPS = [
+    ("get_user_by_id", lookup_by_id),
+    ("get_user_by_email", lookup_by_email),
+    ("authenticate()", authenticate),
+]
+
+MODES = {
+    "select, no cache": (False, {"compiled_cache": None}),
+    "select": (False, {}),
+    "lambda_stmt": (True, {}),
+}
+
+
+async def cpu_per_call(session: AsyncSession, lookup, use_service: bool, execution_options: dict, calls: int) -> float:
+    """Mean CPU microseconds per lookup, after a warm-up pass."""
+    service = UserService(session) if use_service else None
+    for i in range(1, 101):
+        await lookup(session, service, i, execution_options)
+    session.expunge_all()
+    
+    start = time.process_time()
+    for n in range(calls):
+        await lookup(session, service, n % USERS + 1, execution_options)
+        if n % 100 == 0:
+            session.expunge_all()  # keep the identity map from growing into the measurement
+    return (time.process_time() - start) / calls * 1_000_000
+
+
+async def main(calls: int) -> None:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    hashed_password = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash(PASSWORD)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [
+            {"email": EMAIL.format(i), "username": f"user{i}", "hashed_password": hashed_password}
+            for i in range(1, USERS + 1)
+        ])
+    
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        for name, lookup in LOOKUPS:
+            results = {
+                mode: await cpu_per_call(session, lookup, use_service, options, calls)
+                for mode, (use_service, options) in MODES.items()
+            }
+            saved = results["select"] - results["lambda_stmt"]
+            print(
+                f"{name:<18} "
+                + " ".join(f"{mode}={us:.1f}us" for mode, us in results.items())
+                + f"  saved={saved:.1f}us/call"
+            )
+    
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
+
+
+# File: tests/benchmarks/bench_startup.py
+"""
+Cold-start benchmark: worker boot and pytest collection time.
+
+Each sample runs in a fresh interpreter so module caches don't carry
+over. Run with:
+
+    python -m tests.benchmarks.bench_startup [runs]
+"""
+import statistics
+import subprocess
+import sys
+import time
+
+from src.core.startup_profile import run_probe
+
+
+def sample_boot(runs: int) -> dict:
+    """Time ``import src.main`` and ``create_app()`` across fresh processes."""
+    imports, factories = [], []
+    for _ in range(runs):
+        import_seconds, create_app_seconds = map(float, run_probe().stdout.split())
+        imports.append(import_seconds)
+        factories.append(create_app_seconds)
+    return {
+        "import_ms": statistics.median(imports) * 1000,
+        "create_app_ms": statistics.median(factories) * 1000,
+    }
+
+
+def sample_collection(runs: int) -> float:
+    """Median wall time of ``pytest --collect-only`` in milliseconds."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "pytest", "--collect-only", "-q", "-p", "no:cacheprovider"],
+            capture_output=True,
+            check=True,
+        )
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    boot = sample_boot(runs)
+    print(f"import src.main     median {boot['import_ms']:8.1f} ms")
+    print(f"create_app()        median {boot['create_app_ms']:8.1f} ms")
+    print(f"pytest collection   median {sample_collection(max(1, runs // 2)):8.1f} ms")
+
+
+# File: tests/benchmarks/bench_workers.py
+"""
+Throughput scaling of the pre-fork launcher from 1 to N workers.
+
+Runs the load-test suite against ``python -m src.serve --workers n`` for
+each n and prints a markdown table to paste into the deployment notes:
+
+    python -m tests.benchmarks.bench_workers [--max-workers 8] [--concurrency 200]
+
+The load generator is a single asyncio process. Once its own CPU use
+nears 100% the numbers measure the client, not the server: run it on a
+separate machine (or several) for worker counts close to the core count.
+Record the table together with the CPU model, core count and endpoint
+mix; it is only meaningful for the hardware it was measured on.
+"""
+import argparse
+import asyncio
+import os
+from typing import List
+
+from tests.benchmarks.loadtest import BENCH_DATABASE_URL, ENDPOINTS, run_suite
+
+
+def worker_counts(max_workers: int) -> List[int]:
+    """1, 2, 4, ... up to and including max_workers."""
+    counts, n = [], 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    return counts + [max_workers]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure throughput scaling across worker counts")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--endpoints", nargs="+", choices=list(ENDPOINTS), default=["health", "users_me"])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", BENCH_DATABASE_URL)
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    rows, single = [], {}
+    for workers in worker_counts(args.max_workers):
+        results = asyncio.run(
+            run_suite("socket", args.endpoints, args.requests, args.concurrency, workers)
+        )
+        for name, result in results.items():
+            single.setdefault(name, result.throughput_rps)
+            rows.append((workers, name, result, result.throughput_rps / single[name]))
+
+    print(f"CPU cores: {os.cpu_count()}, concurrency: {args.concurrency}\n")
+    print("| workers | endpoint | req/s | speedup | p50 ms | p99 ms | errors |")
+    print("|--------:|----------|------:|--------:|-------:|-------:|-------:|")
+    for workers, name, result, speedup in rows:
+        print(
+            f"| {workers} | {name} | {result.throughput_rps:.0f} | {speedup:.2f}x "
+            f"| {result.p50_ms:.2f} | {result.p99_ms:.2f} | {result.errors} |"
+        )
+
+
+if __name__ == "__main__":
+    main()
+
+
+# File: tests/benchmarks/bench_auth.py
+"""
+Per-request auth overhead: full JWT verification vs. the verified-token cache.
+
+Run with:
+
+    python -m tests.benchmarks.bench_auth [iterations]
+"""
+import asyncio
+import sys
+import time
+
+from src.core.auth import RevocationList, TokenVerifier, create_access_token
+from src.core.cache import TTLCache
+
+
+async def time_verify(verifier: TokenVerifier, token: str, iterations: int, cold: bool) -> float:
+    """Mean microseconds per verify() call."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        if cold:
+            verifier.cache.clear()
+        await verifier.verify(token)
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+async def main(iterations: int) -> None:
+    verifier = TokenVerifier(cache=TTLCache(maxsize=1000, ttl=60), revocations=RevocationList())
+    token = create_access_token(data={"sub": "1"})
+    
+    cold = await time_verify(verifier, token, iterations, cold=True)
+    warm = await time_verify(verifier, token, iterations, cold=False)
+    print(f"decode + verify   {cold:8.2f} us/request")
+    print(f"cached claims     {warm:8.2f} us/request  ({cold / warm:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000))
 ```
 
 ## 🎯 **Key Testing Patterns**
 
 ### **1. Test Isolation**
-- **Fresh database per test**: Prevents test interdependencies
-- **Dependency overrides**: Mock external services cleanly
+- **Rollback per test**: Schema created once per session; each test runs in an outer transaction + SAVEPOINT that is rolled back
+- **Async sessions**: `aiosqlite` test engine mirrors the production `AsyncSession` path
+- **In-memory by default**: Shared-connection SQLite; set `TEST_DATABASE_URL` for a file or Postgres
+- **Dependency overrides**: Mock external services cleanly, on a per-worker `create_app()` instance
+- **Parallel workers**: `pytest -n auto`; each xdist worker gets its own database file/schema
+- **One event loop**: `client` calls the app through `ASGITransport` on the test's loop, where `db_session`'s connection lives; no `TestClient` portal thread
+- **Lifespan per test**: `client` starts the app's workers after the per-test cache, outbox and activity patches and drains them before teardown, so no worker races the next test's patches
 - **Fixture cleanup**: Automatic resource management
 
 ### **2. Comprehensive Coverage**
 - **Unit tests**: Business logic without external dependencies
 - **Integration tests**: Full request/response cycles
 - **Performance tests**: Response time and load testing
+- **Benchmarks**: Standalone scripts under `tests/benchmarks/` comparing latency percentiles and CPU per request
+- **Load tests**: `tests/benchmarks/loadtest.py` reports throughput and p50/p95/p99, stores JSON baselines and fails on significant regressions
+- **Read model cost**: `tests/benchmarks/bench_read_models.py` reports objects/sec and bytes/object for ORM + pydantic reads vs. `UserRecord`; unit tests pin `UserRecord.to_json()` to `UserResponse`'s exact bytes
+- **Statement caching**: `tests/benchmarks/bench_compiled_queries.py` reports per-call CPU for the user lookups with no compiled cache, plain `select()`, and the service's `lambda_stmt` call sites
+- **Worker scaling**: `tests/benchmarks/bench_workers.py` runs the load suite against `python -m src.serve` at 1, 2, 4 … N workers and prints a speedup table for the deployment notes
 - **Async tests**: Proper async/await testing patterns
 
 ### **3. Effective Mocking**
 - **External services**: Email, payment, API integrations
 - **Database operations**: Test business logic in isolation
 - **Cache systems**: Redis, Memcached mocking
+- **In-memory stand-ins**: `FakeRedis` behind a real `CacheService` for behavioural cache tests
+- **Write-behind capture**: `activity_rows` swaps the activity buffer's session for a `RecordingSession`, so tests assert on flushed rows and the app's worker never reaches a real database
+- **Local protocol fakes**: `FakeSMTPServer` on a loopback port exercises the real SMTP transport, batching, retries and spool recovery; `email_outbox` keeps app tests off the network
 - **Time-based operations**: Freeze time for consistent tests
 
 ### **4. Quality Gates**
-- **Response time requirements**: Performance thresholds
-- **Memory usage limits**: Resource consumption monitoring
+- **Response time requirements**: Latency distributions compared by `loadtest.py` against baselines it recorded with the same transport and worker count, not single-sample thresholds
+- **Memory usage limits**: tracemalloc per-endpoint retained bytes per request, warm-up vs. steady-state leak detection
+- **Probe isolation**: Readiness checks exercised with fake dependencies that hang or fail, asserting timeouts and result caching
+- **Rate limits**: two `RateLimiter`s on one `FakeRedis` act as two workers sharing a budget; an app built with `RATE_LIMIT_ENABLED` checks login for 429 + `Retry-After`, including via a trailing-slash path
+- **Replica routing**: two SQLite files stand in for primary and replica with differing rows, so responses show which database served reads, sticky reads after writes and lag fallback
+- **Conditional requests**: ETag round-trips assert 304 on revalidation, 200 with a new ETag after PATCH, and no session use on the 304 path
+- **Query budgets**: `assert_max_queries(n)` wraps client calls and fails with the repeated statements listed, catching N+1 loops in CI
+- **Request phase timing**: `Server-Timing` header and `/health/metrics` histograms checked on an app built with instrumentation enabled
 - **Concurrent load handling**: Multi-threading tests
 - **Error scenario coverage**: Failure mode testing
 